@@ -0,0 +1,138 @@
+import os
+import sys
+import json
+import argparse
+import tracemalloc
+
+import ConvertAndAnalyzeArkSave as ark
+import GenerateSyntheticArkSave as synthetic
+
+"""
+Times the analyzer's stages on made-up saves, so performance work can be
+measured on a plain Linux box without a real .ark or the Windows-only
+converter.  For every scale it generates a save with
+GenerateSyntheticArkSave.py (unless one of that size is already there) and
+then runs, in order:
+
+    simplify_json_to_game_objects
+    process_game_objects
+    every registered report (inventory, items, hungry_tames, low_fuel)
+
+Throughput, CPU, bytes and peak memory per stage are printed as a table and
+written to bench/TheIsland_<objects>_benchmark.json in the same layout as
+MyMap_metrics.json.  Peak RSS only ever goes up over a run; add
+--tracemalloc to also get the peak Python allocations within each stage
+(this slows everything down, so don't compare its timings with plain runs).
+The reports run one after another here, so each gets timed on its own.
+--reports runs only some of them, skipping what they don't need while
+processing, the way the analyzer's --reports does.
+
+Usage:   python BenchmarkArkPipeline.py --objects 100000 1000000 5000000 [--dir bench]
+"""
+
+def ensure_save(directory, objects, seed):
+    json_filename = os.path.join(directory, "TheIsland_{}.json".format(objects))
+    values_filename = os.path.join(directory, "values.json")
+    if not os.path.exists(json_filename):
+        print("Generating {} game objects into {}...".format(objects, json_filename), flush=True)
+        synthetic.generate_save(json_filename, objects, seed)
+    if not os.path.exists(values_filename):
+        synthetic.generate_values(values_filename, seed)
+    return json_filename
+
+def run_stage(metrics, name, function, reads, writes, objects, use_tracemalloc, python_peaks):
+    if use_tracemalloc:
+        tracemalloc.reset_peak()
+    with metrics.stage(name, reads=reads, writes=writes) as stage:
+        result = function()
+        stage.objects = objects() if callable(objects) else objects
+    if use_tracemalloc:
+        python_peaks[name] = tracemalloc.get_traced_memory()[1]
+    return result
+
+def benchmark(json_filename, use_tracemalloc=False, parser='auto', reports=None):
+    """
+    Runs the stages on one save (reading values.json from the current
+    directory, like the analyzer does) and returns the metrics dict.
+    parser is the json parser backend for the process stage, and reports
+    the reports to run (default all of them).
+    """
+    reports = reports or ark.report_names()
+    state = ark.GameState()
+    if tuple(reports) != ark.report_names():
+        state.plan = ark.ReportPlan(reports)
+    metrics = ark.RunMetrics(json_filename, state)
+    metrics.notes['parser'] = ark.choose_parser(parser, json_filename)
+    metrics.notes['reports'] = list(reports)
+    python_peaks = dict()
+    objects_filename = json_filename.replace(".json", "_game_objects.json")
+
+    if use_tracemalloc:
+        tracemalloc.start()
+    run_stage(metrics, "simplify", lambda: ark.simplify_json_to_game_objects(json_filename, objects_filename),
+              [json_filename], [objects_filename], None, use_tracemalloc, python_peaks)
+    count = run_stage(metrics, "process", lambda: ark.process_game_objects(state, json_filename, None, metrics.notes['parser']),
+                      [json_filename], [], None, use_tracemalloc, python_peaks)
+    state.plan = None
+    for stage in metrics.stages:
+        stage.objects = count  # simplify and process both go through every game object
+    context = {'multipliers': None, 'values_by_bp': None, 'objects': None}  # report_hungry_tames loads values.json within its stage
+    for plugin in [ark.REPORTS[name] for name in ark.report_names() if name in reports]:
+        filename = plugin.filename(json_filename.replace(".json", ".ark"))
+        run_stage(metrics, plugin.stage, lambda: plugin.write(state, filename, context),
+                  ['values.json'] if plugin.uses_values else [], [filename],
+                  (lambda: plugin.objects(state)) if plugin.objects else None, use_tracemalloc, python_peaks)
+    if use_tracemalloc:
+        tracemalloc.stop()
+
+    results = metrics.as_dict()
+    for stage in results['stages']:
+        if stage['name'] in python_peaks:
+            stage['python_peak_bytes'] = python_peaks[stage['name']]
+    return results
+
+def megabytes(value):
+    return "" if value is None else "{:,.1f}".format(value / 1024.0 / 1024.0)
+
+def print_table(results):
+    print("{:<14}{:>10}{:>10}{:>14}{:>12}{:>12}{:>12}".format("stage", "wall s", "cpu s", "objects/s", "read MB", "written MB", "peak MB"))
+    for stage in results['stages']:
+        print("{:<14}{:>10.2f}{:>10.2f}{:>14}{:>12}{:>12}{:>12}".format(
+            stage['name'], stage['wall_seconds'], stage['cpu_seconds'],
+            "{:,.0f}".format(stage['objects_per_second']) if stage['objects_per_second'] else "",
+            megabytes(stage['bytes_read']), megabytes(stage['bytes_written']),
+            megabytes(stage.get('python_peak_bytes', stage['peak_rss_bytes']))))
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmarks the analyzer on synthetic saves.")
+    parser.add_argument('--objects', type=int, nargs='+', default=[100000],
+                        help="save sizes to run, e.g. 100000 1000000 5000000")
+    parser.add_argument('--dir', default="bench", help="where the saves and results go (default bench)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--tracemalloc', action='store_true', help="also record peak Python allocations per stage")
+    parser.add_argument('--parser', choices=['auto'] + list(ark.PARSER_BACKENDS), default='auto',
+                        help="json parser backend for the process stage (default auto)")
+    parser.add_argument('--reports', metavar="inventory,items,hungry,fuel",
+                        help="only run these reports (default all)")
+    args = parser.parse_args(argv[1:])
+    try:
+        reports = ark.parse_report_names(args.reports)
+    except ValueError as e:
+        parser.error(str(e))
+
+    os.makedirs(args.dir, exist_ok=True)
+    os.chdir(args.dir)  # report_hungry_tames reads values.json from the current directory
+    for objects in args.objects:
+        json_filename = ensure_save("", objects, args.seed)
+        results = benchmark(json_filename, args.tracemalloc, args.parser, reports)
+        results_filename = json_filename.replace(".json", "_benchmark.json")
+        with open(results_filename, "w") as outfile:
+            json.dump(results, outfile, indent=2)
+            outfile.write("\n")
+        print("\n{} game objects, {} parser ({}):".format(objects, results['notes']['parser'],
+              "peak MB is Python allocations" if args.tracemalloc else "peak MB is RSS so far"))
+        print_table(results)
+        print("Wrote {}\n".format(os.path.join(args.dir, results_filename)))
+
+if __name__ == '__main__':
+    main(sys.argv)
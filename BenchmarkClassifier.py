@@ -0,0 +1,116 @@
+import sys
+import time
+import random
+import argparse
+
+import ConvertAndAnalyzeArkSave as ark
+
+"""
+Micro-benchmark for identifyType.  Runs the old if/else chain and the
+table-driven, per-class memoized classifier over the same made-up game
+objects, checks they agree, and prints objects/sec for each.
+
+The property lookups are built before the clock starts for both of them,
+because handle_object builds them anyway for the rest of the script.
+
+Usage:   python BenchmarkClassifier.py [--objects 200000] [--classes 3000]
+"""
+
+def legacy_identifyType(gameobject):
+    """
+    identifyType as it was before the rule tables, kept here to compare against.
+    """
+    if ("Tribute" in gameobject['class']):
+        return "Obelisk_Related"
+
+    if ("InventoryComponent" in gameobject['class']):
+        return "Inventory"
+
+    if ("PrimalInventoryBP" in gameobject['class']):
+        return "Inventory"
+
+    if ("PrimalItem" in gameobject['class']):
+        if (ark.isEngram(gameobject)):
+            return "Engram"
+        else:
+            return "ItemStack"
+
+    for prop in gameobject.get('properties', {}):
+        if prop['name'] == 'OwnerInventory':
+            return "ItemStack"
+        if prop['name'] == 'MyInventoryComponent':
+            return "InventoryOwner"
+        if prop['name'] == 'TamerString':
+            return "TameDinosaur"
+
+    if gameobject['class'].startswith("DinoCharacterStatusComponent") or \
+       gameobject['class'].startswith("Mega_DinoCharacterStatusComponent"):
+        return "DinosaurStatus"
+
+    if gameobject['class'].startswith("PlayerCharacterStatusComponent"):
+        return "PlayerStatusComponent"
+
+    if ("_Character_BP_C" in gameobject['class']):
+        return "WildDinosaur"
+
+    return "miscellaneous"
+
+def filler_properties(rng, count):
+    return [{"name": "SomeProperty" + str(rng.randrange(40)), "type": "IntProperty", "value": rng.randrange(100)}
+            for i in range(count)]
+
+def make_game_objects(count, distinct_classes, seed=1):
+    """
+    Roughly the mix of a real save: lots of items and structures, a fair
+    number of wild dinos and their status components, fewer tames.
+    """
+    rng = random.Random(seed)
+    kinds = [
+        ("PrimalItemResource_Thing{}_C", 30, lambda: [{"name": "OwnerInventory", "type": "ObjectProperty", "value": 1}]),
+        ("PrimalItem_Engram{}_C", 5, lambda: [{"name": "bIsEngram", "type": "BoolProperty", "value": True}]),
+        ("PrimalInventoryBP_Box{}_C", 5, lambda: []),
+        ("StorageBox_Thing{}_C", 10, lambda: [{"name": "MyInventoryComponent", "type": "ObjectProperty", "value": 2}]),
+        ("Dino{}_Character_BP_C", 15, lambda: []),
+        ("Dino{}_Character_BP_C", 3, lambda: [{"name": "TamerString", "type": "StrProperty", "value": "someone"},
+                                              {"name": "MyInventoryComponent", "type": "ObjectProperty", "value": 3}]),
+        ("DinoCharacterStatusComponent_BP_Thing{}_C", 15, lambda: []),
+        ("PlayerCharacterStatusComponent_BP{}_C", 1, lambda: []),
+        ("Wall_Stone{}_C", 16, lambda: []),
+    ]
+    weights = [weight for (pattern, weight, props) in kinds]
+    objects = []
+    for i in range(count):
+        (pattern, weight, props) = rng.choices(kinds, weights)[0]
+        className = pattern.format(rng.randrange(max(1, distinct_classes // len(kinds))))
+        properties = filler_properties(rng, rng.randrange(2, 12)) + props()
+        rng.shuffle(properties)
+        objects.append(ark.index_properties({"id": i, "class": className, "properties": properties}))
+    return objects
+
+def time_classifier(classify, gameobjects):
+    start = time.perf_counter()
+    results = [classify(gameobject) for gameobject in gameobjects]
+    return (time.perf_counter() - start, results)
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Compare the old and new identifyType.")
+    parser.add_argument('--objects', type=int, default=200000)
+    parser.add_argument('--classes', type=int, default=3000)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args(argv[1:])
+
+    gameobjects = make_game_objects(args.objects, args.classes)
+    for round in range(args.rounds):
+        ark.classify_class_name.cache_clear()
+        (legacy_seconds, legacy_results) = time_classifier(legacy_identifyType, gameobjects)
+        (table_seconds, table_results) = time_classifier(ark.identifyType, gameobjects)
+        if legacy_results != table_results:
+            print("The two classifiers disagree!")
+            return 1
+        print("Round {}: legacy {:,.0f} objects/sec, table-driven {:,.0f} objects/sec ({:.2f}x)".format(
+            round + 1, len(gameobjects) / legacy_seconds, len(gameobjects) / table_seconds,
+            legacy_seconds / table_seconds))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
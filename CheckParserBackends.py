@@ -0,0 +1,122 @@
+"""
+Conformance check for the json parser backends.  Reads the same save with
+every backend that's installed (see ark.choose_parser), serially and with
+--workers, and checks they all classify the game objects exactly the same
+way as naya: same maps, same records, same values down to int-vs-float.
+A minified copy of the save is read too, which the slices backend can't
+cut up, to check the streaming backends don't depend on the layout, and a
+gzipped copy, the way --compress gzip leaves it.  The slices backend reads
+neither; it hands them to ijson (see ark.choose_parser).
+
+Without a json it makes up a small synthetic save to check against.
+
+Usage:   python CheckParserBackends.py [path/to/TheIsland.json ...] [--objects 20000] [--workers 2]
+         (python -m pytest runs it on a small synthetic save)
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from array import array
+
+import ConvertAndAnalyzeArkSave as ark
+import GenerateSyntheticArkSave as synthetic
+
+def canonical(value):
+    """
+    Something that compares equal only when the values do, types included,
+    so 1, 1.0 and True don't pass for each other.  Dict order counts too,
+    because the reports come out in that order.
+    """
+    if hasattr(value, '__slots__'):
+        return (type(value).__name__,) + tuple(canonical(getattr(value, name)) for name in value.__slots__)
+    if isinstance(value, dict):
+        return ('dict',) + tuple((canonical(key), canonical(item)) for (key, item) in value.items())
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple(canonical(item) for item in value)
+    if isinstance(value, array):
+        return ('array', value.typecode, value.tolist())
+    return (type(value).__name__, repr(value))
+
+def classify(json_filename, parser, workers=1):
+    state = ark.GameState()
+    start = time.perf_counter()
+    with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet):  # no progress lines
+        if workers > 1:
+            count = ark.process_game_objects_parallel(state, json_filename, None, workers, parser)
+        else:
+            count = ark.process_game_objects(state, json_filename, None, parser)
+    return (count, state, time.perf_counter() - start)
+
+def first_difference(expected, actual):
+    for (name, value) in expected.game_objects().items():
+        other = actual.game_objects()[name]
+        if canonical(value) == canonical(other):
+            continue
+        for key in value:
+            if key not in other or canonical(value[key]) != canonical(other[key]):
+                return "{}[{}]: {} vs {}".format(name, key, canonical(value[key]), canonical(other.get(key)))
+        return "{}: different keys or order".format(name)
+    return None
+
+def minified_copy(json_filename, directory):
+    minified_filename = os.path.join(directory, os.path.basename(json_filename).replace(".json", "_minified.json"))
+    with open(json_filename) as infile:
+        everything = json.load(infile)
+    with open(minified_filename, "w") as outfile:
+        json.dump(everything, outfile, separators=(',', ':'))
+    return minified_filename
+
+def gzipped_copy(json_filename, directory):
+    gzipped_filename = os.path.join(directory, os.path.basename(json_filename).replace(".json", "_gzipped.json"))
+    shutil.copyfile(json_filename, gzipped_filename)
+    return ark.compress_file(gzipped_filename, 'gzip')
+
+def check(json_filename, workers, directory):
+    """ Returns how many backend runs disagreed with naya. """
+    print("{}:".format(json_filename), flush=True)
+    (expected_count, expected, seconds) = classify(json_filename, 'naya')
+    print("    {:<24}{:>10} objects {:>8.2f}s  (reference)".format("naya", expected_count, seconds), flush=True)
+
+    runs = [(parser, json_filename, 1) for parser in ark.available_parsers() if parser != 'naya']
+    runs += [(parser, json_filename, workers) for parser in ('slices', 'naya')]
+    runs += [(parser, minified_copy(json_filename, directory), 1) for parser in ark.available_parsers() if parser != 'slices']
+    runs += [(parser, gzipped_copy(json_filename, directory), 1) for parser in ark.available_parsers() if parser != 'slices']
+    failures = 0
+    for (parser, filename, run_workers) in runs:
+        copy = " gzipped" if filename.endswith(".gz") else " minified" if filename != json_filename else ""
+        label = parser + (" x{}".format(run_workers) if run_workers > 1 else "") + copy
+        (count, state, seconds) = classify(filename, parser, run_workers)
+        difference = "count {} vs {}".format(count, expected_count) if count != expected_count else first_difference(expected, state)
+        print("    {:<24}{:>10} objects {:>8.2f}s  {}".format(label, count, seconds, "MISMATCH " + difference if difference else "ok"), flush=True)
+        failures = failures + (1 if difference else 0)
+    return failures
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Checks that every json parser backend classifies a save the same way.")
+    parser.add_argument('json_filenames', nargs='*', metavar="path/to/TheIsland.json")
+    parser.add_argument('--objects', type=int, default=20000, help="size of the synthetic save if no json is given")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv[1:])
+
+    missing = [parser for parser in ark.PARSER_BACKENDS if parser not in ark.available_parsers()]
+    if missing:
+        print("Not installed, so not checked: {}".format(", ".join(missing)))
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        json_filenames = args.json_filenames
+        if not json_filenames:
+            json_filenames = [os.path.join(directory, "TheIsland.json")]
+            synthetic.generate_save(json_filenames[0], args.objects, args.seed)
+        for json_filename in json_filenames:
+            failures = failures + check(json_filename, max(2, args.workers), directory)
+    print("All backends agree." if not failures else "{} runs disagreed with naya.".format(failures))
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
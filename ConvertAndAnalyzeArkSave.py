@@ -1,29 +1,134 @@
 import subprocess
 import naya
+from naya.json import TOKEN_TYPE
 import sys
+import io
+import itertools
+import mmap
 import re
+import math
+import glob
 import os
 import time
 import json
-from functools import reduce
+import tempfile
+import contextlib
+import argparse
+import threading
+import _thread
+import gc
+import urllib.parse
+import hashlib
+import pickle
+import sqlite3
+import struct
+import bisect
+import zlib
+import importlib
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from array import array
+from functools import reduce, lru_cache
 from pprint import pprint
+try:
+    import numpy
+except ImportError:
+    numpy = None  # tame stats are then worked out one tame at a time
+try:
+    import ijson
+    ijson = ijson.get_backend('yajl2_c')  # the pure python ijson backends are no faster than naya
+except ImportError:
+    ijson = None
+try:
+    import zstandard  # only for --compress zstd; pip install zstandard
+except ImportError:
+    zstandard = None
+try:
+    import resource  # not on Windows; peak memory just isn't recorded there
+except ImportError:
+    resource = None
 
 
-# Global variables hold the sorted game objects ahead of reporting.
-owners = dict()
-inventories = dict()
-itemstacks = dict()
-miscellaneous = dict()
-inventory_to_owner_reverse_lookup = dict()
-tame_dinos = dict()
-dino_status = dict()
-generatorFuel = dict()
-
 # Status values are an ordered sequence rather than named.
 # Constants help us stay sane.
 INDEX_FOOD = 4
+NUM_STATS = 12
 PRIMALEARTH = "/Game/PrimalEarth/Dinos/"
 
+# Tames below this fraction of their food total count as hungry.
+HUNGRY_FOOD_PERCENT = 0.50
+
+# values.json gets compiled into this, next to it, and is only reread when it changes.
+SPECIES_INDEX_FILENAME = "values_index.pickle"
+SPECIES_INDEX_VERSION = 2
+
+# Server settings that change how stats grow, as used by calculate_stat_value.
+# Official servers leave them all at 1.0; see --server-multipliers.
+#   IwM  PerLevelStatsMultiplier_DinoWild
+#   TmM  PerLevelStatsMultiplier_DinoTamed_Affinity
+#   IdM  PerLevelStatsMultiplier_DinoTamed
+#   TaM  PerLevelStatsMultiplier_DinoTamed_Add
+#   IBM  BabyImprintingStatScaleMultiplier
+DEFAULT_SERVER_MULTIPLIERS = {'IwM': 1.0, 'TmM': 1.0, 'IdM': 1.0, 'TaM': 1.0, 'IBM': 1.0}
+
+# Bump this whenever identifyType or the record classes change, so state
+# cached by an older version of the classifier is never reused.
+CLASSIFIER_VERSION = 3
+
+# Progress lines are printed at most this often, in seconds.
+PROGRESS_INTERVAL_SECONDS = 0.5
+
+# How long --pipeline waits before looking again for more json from the converter.
+FOLLOW_POLL_SECONDS = 0.05
+
+# The parallel reader cuts the objects array into this many pieces per
+# worker, so one slow piece doesn't leave the other workers idle.
+CHUNKS_PER_WORKER = 4
+
+# Owners and tames are indexed by location in square cells this many
+# units on a side (a foundation is 300), and a feeding trough is taken to
+# feed tames within FEEDING_TROUGH_RADIUS of it; see grid_candidates.
+SPATIAL_CELL_SIZE = 5000
+FEEDING_TROUGH_RADIUS = 2500
+
+# --low-memory: how much memory SQLite may use for the spilled owners,
+# inventories and item stacks, and how many records are written at a time.
+LOW_MEMORY_CEILING_MB = 256
+SPILL_BATCH_ROWS = 5000
+
+# Bump when the tables in MyMap_items.sqlite change; see ItemIndex.
+ITEM_INDEX_VERSION = 1
+
+# MyMap_objects.idx, where each game object is in MyMap.json: the bytes
+# it starts with and its header (those, the version, the object count,
+# the json's size, how many compressed frames it has, the codec it's
+# compressed with and the length of its file name, which comes next).
+# Bump the version when the layout changes; see ObjectOffsets.
+OBJECT_INDEX_MAGIC = b"ARKOBJIX"
+OBJECT_INDEX_VERSION = 3
+OBJECT_INDEX_HEADER = struct.Struct("=8sQQQQ8sQ")
+
+# --watch: how often to check the save for changes (seconds), which port
+# the queries are answered on, and how many rows a query returns by default.
+WATCH_POLL_SECONDS = 5
+WATCH_PORT = 8808
+QUERY_ROW_LIMIT = 1000
+
+# How many report rows ReportWriter holds before writing them out.
+REPORT_BUFFER_ROWS = 5000
+
+# --compress: the codecs, the extension each adds to a filename, their
+# compression levels, and how much is read or written at a time.
+COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+CODEC_CHUNK_BYTES = 256 * 1024
+
+# A compressed MyMap.json starts a new gzip member or zstd frame after this
+# much json, so looking one object up only has to decompress one of them.
+JSON_FRAME_BYTES = 1024 * 1024
+
 # Order from zero: 0 Health, 1 Stamina, 2 Torpidity, 3 Oxygen, 4 Food, 5 Water, 
 # 6 Temperature, 7 Weight, 8 MeleeDamageMultiplier, 9 SpeedMultiplier, 
 # 10 TemperatureFortitude, 11 CraftingSpeedMultiplier
@@ -41,106 +146,724 @@ not_really_dinos = [
 ]
 
 
-def getPropertyValueByName(properties, name):
-    for prop in properties:
-        if prop['name'] == name:
-            return prop['value']
-    return ''
-
-def getPropertyValueByNameAndIndex(properties, name, index):
-    for prop in properties:
-        if prop['name'] == name and prop.get('index', '') == index:
-            return prop['value']
-    return 0.0
+def index_properties(gameobject):
+    """
+    Builds the name->value and (name, index)->value lookups for one game
+    object and stores them on the object itself.  The accessors below use
+    these instead of walking the whole properties list on every call.
+    When a name shows up more than once, the first one wins, the same as
+    the old linear scan did.
+    """
+    by_name = dict()
+    by_name_and_index = dict()
+    for prop in gameobject.get('properties', None) or []:
+        name = prop['name']
+        if name not in by_name:
+            by_name[name] = prop['value']
+        key = (name, prop.get('index', ''))
+        if key not in by_name_and_index:
+            by_name_and_index[key] = prop['value']
+    gameobject['propertiesByName'] = by_name
+    gameobject['propertiesByNameAndIndex'] = by_name_and_index
+    return gameobject
+
+def propertiesByName(gameobject):
+    if 'propertiesByName' not in gameobject:
+        index_properties(gameobject)
+    return gameobject['propertiesByName']
+
+def propertiesByNameAndIndex(gameobject):
+    if 'propertiesByNameAndIndex' not in gameobject:
+        index_properties(gameobject)
+    return gameobject['propertiesByNameAndIndex']
+
+def getPropertyValueByName(gameobject, name):
+    return propertiesByName(gameobject).get(name, '')
+
+def getPropertyValueByNameAndIndex(gameobject, name, index):
+    return propertiesByNameAndIndex(gameobject).get((name, index), 0.0)
 
 def isEngram(gameobject):
-    if (not gameobject.get('properties', {})):
-        return False
-    for prop in gameobject['properties']:
-        if prop['name'] == 'bIsEngram':
-            return prop['value']
-    return False
+    return propertiesByName(gameobject).get('bIsEngram', False)
 
 def isSpecialInventoryItem(gameobject):
     # default blueprints/engrams are generally hidden from inventory display
-    if (not gameobject.get('properties', {})):
-        return False
-    for prop in gameobject['properties']:
-        if prop['name'] == 'bAllowRemovalFromInventory':
-            return not prop['value'] 
+    properties = propertiesByName(gameobject)
+    if 'bAllowRemovalFromInventory' in properties:
+        return not properties['bAllowRemovalFromInventory']
     return False
 
-def identifyType(gameobject):
-
-    if ("Tribute" in gameobject['class']):
-        return "Obelisk_Related"
-
-    if ("InventoryComponent" in gameobject['class']):
-        return "Inventory"
+def itemStackOrEngram(gameobject):
+    if (isEngram(gameobject)):
+        return "Engram"
+    else:
+        return "ItemStack"
+itemStackOrEngram.types = ("ItemStack", "Engram")  # what it can return; see ReportPlan
+
+# Classification rules for identifyType, checked top to bottom:
+#   1. CLASS_NAME_RULES decide on the class name alone.  The type can be a
+#      function of the game object when the class name isn't quite enough.
+#   2. Otherwise PROPERTY_RULES look at the properties; whichever of these
+#      property names comes first in the object wins.
+#   3. Otherwise FALLBACK_CLASS_NAME_RULES decide on the class name again,
+#      and anything left over is "miscellaneous".
+# To teach the script about mod classes, add rows with add_class_rule or
+# add_property_rule rather than editing identifyType.
+CLASS_NAME_RULES = [
+    ("contains", "Tribute", "Obelisk_Related"),
+    ("contains", "InventoryComponent", "Inventory"),
+    ("contains", "PrimalInventoryBP", "Inventory"),
+    ("contains", "PrimalItem", itemStackOrEngram),
+]
+PROPERTY_RULES = [
+    ("OwnerInventory", "ItemStack"),
+    ("MyInventoryComponent", "InventoryOwner"),
+    ("TamerString", "TameDinosaur"),
+]
+FALLBACK_CLASS_NAME_RULES = [
+    ("startswith", "DinoCharacterStatusComponent", "DinosaurStatus"),
+    ("startswith", "Mega_DinoCharacterStatusComponent", "DinosaurStatus"),
+    ("startswith", "PlayerCharacterStatusComponent", "PlayerStatusComponent"),
+    ("contains", "_Character_BP_C", "WildDinosaur"),
+]
 
-    if ("PrimalInventoryBP" in gameobject['class']):
-        return "Inventory"
+def classNameMatches(className, test, text):
+    if test == "startswith":
+        return className.startswith(text)
+    if test == "endswith":
+        return className.endswith(text)
+    if test == "equals":
+        return className == text
+    return text in className
+
+@lru_cache(maxsize=None)
+def classify_class_name(className):
+    """
+    The class-name part of identifyType, worked out once per distinct class
+    (a save has a few thousand, against a couple hundred thousand objects).
+    Returns (decided, fallback): decided is the type from CLASS_NAME_RULES,
+    or None when the properties have to be looked at; fallback is the type
+    to use when no property rule matches either.
+    """
+    for (test, text, objtype) in CLASS_NAME_RULES:
+        if classNameMatches(className, test, text):
+            return (objtype, None)
+    for (test, text, objtype) in FALLBACK_CLASS_NAME_RULES:
+        if classNameMatches(className, test, text):
+            return (None, objtype)
+    return (None, "miscellaneous")
+
+def classify_by_properties(gameobject):
+    properties = propertiesByName(gameobject)
+    found = None
+    for (name, objtype) in PROPERTY_RULES:
+        if name in properties:
+            if found is not None:
+                break
+            found = objtype
+    else:
+        return found
+    # More than one rule matches; the property that comes first wins.
+    objtype_by_name = dict(PROPERTY_RULES)
+    for prop in gameobject['properties']:
+        if prop['name'] in objtype_by_name:
+            return objtype_by_name[prop['name']]
 
-    if ("PrimalItem" in gameobject['class']):
-        if (isEngram(gameobject)):
-            return "Engram"
-        else:
-            return "ItemStack"
+def add_class_rule(test, text, objtype, before_properties=True):
+    """
+    Adds a class-name rule, e.g. add_class_rule("startswith", "MyMod_Storage", "InventoryOwner").
+    test is one of contains, startswith, endswith, equals.  Rules added
+    with before_properties=False only apply when no property rule matches.
+    """
+    rules = CLASS_NAME_RULES if before_properties else FALLBACK_CLASS_NAME_RULES
+    rules.append((test, text, objtype))
+    classify_class_name.cache_clear()
 
-    for prop in gameobject.get('properties', {}):
-        if prop['name'] == 'OwnerInventory':
-            return "ItemStack"
-        if prop['name'] == 'MyInventoryComponent':
-            return "InventoryOwner"
-        if prop['name'] == 'TamerString':
-            return "TameDinosaur"
+def add_property_rule(name, objtype):
+    PROPERTY_RULES.append((name, objtype))
+    classify_class_name.cache_clear()
 
-    if gameobject['class'].startswith("DinoCharacterStatusComponent") or \
-       gameobject['class'].startswith("Mega_DinoCharacterStatusComponent"): 
-        return "DinosaurStatus"
+def classifier_rules_digest():
+    """
+    A digest of the rule tables as they are now, mod rules included.  It
+    goes in the cache header next to CLASSIFIER_VERSION, since a cache made
+    with other rules classified things differently.  Functions in the
+    tables count by name.
+    """
+    rules = [[tuple(value.__qualname__ if callable(value) else value for value in rule) for rule in table]
+             for table in (CLASS_NAME_RULES, PROPERTY_RULES, FALLBACK_CLASS_NAME_RULES)]
+    return hashlib.sha256(repr(rules).encode("utf-8")).hexdigest()
 
-    if gameobject['class'].startswith("PlayerCharacterStatusComponent"):
-        return "PlayerStatusComponent"
+def identifyType(gameobject):
+    (decided, fallback) = classify_class_name(gameobject['class'])
+    if decided is not None:
+        return decided(gameobject) if callable(decided) else decided
+    return classify_by_properties(gameobject) or fallback
 
-    if ("_Character_BP_C" in gameobject['class']):
-        return "WildDinosaur"
+def intern_text(value):
+    """
+    Class, player and tribe names repeat across thousands of objects;
+    interning them means every record shares one copy of each string.
+    """
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
 
-    return "miscellaneous"
+def locationOf(gameobject):
+    location = gameobject.get('location', None) or {}
+    return (location.get('x', ''), location.get('y', ''), location.get('z', ''))
 
-def register_owner(owner):
+def statusArray(gameobject, name, typecode):
+    """
+    Pulls one of the indexed status properties (CurrentStatusValues and
+    friends) into a fixed-size array with one slot per stat.  Stat 0 is
+    usually written without an index at all.
+    """
+    values = array(typecode, [0] * NUM_STATS)
+    by_name_and_index = propertiesByNameAndIndex(gameobject)
+    for stat in range(NUM_STATS):
+        value = by_name_and_index.get((name, stat), None)
+        if value is None and stat == 0:
+            value = by_name_and_index.get((name, ''), None)
+        if value:
+            values[stat] = value
+    return values
+
+
+# Compact records kept for reporting.  A parsed game object carries every
+# property the save has, but the reports only ever read a handful of fields,
+# so each object is projected into one of these as soon as identifyType
+# classifies it, and the full dict is dropped.
+
+class OwnerRecord:
+    __slots__ = ('id', 'className', 'x', 'y', 'z', 'ownerName', 'owningPlayerName',
+                 'playerName', 'tameName', 'tribeName', 'inventoryId')
+    properties = ('OwnerName', 'OwningPlayerName', 'PlayerName', 'TameName', 'TribeName', 'MyInventoryComponent')
+
+    def __init__(self, gameobject):
+        self.id = gameobject['id']
+        self.className = intern_text(gameobject['class'])
+        (self.x, self.y, self.z) = locationOf(gameobject)
+        self.ownerName = intern_text(getPropertyValueByName(gameobject, 'OwnerName'))
+        self.owningPlayerName = intern_text(getPropertyValueByName(gameobject, 'OwningPlayerName'))
+        self.playerName = intern_text(getPropertyValueByName(gameobject, 'PlayerName'))
+        self.tameName = getPropertyValueByName(gameobject, 'TameName')
+        self.tribeName = intern_text(getPropertyValueByName(gameobject, 'TribeName'))
+        self.inventoryId = getPropertyValueByName(gameobject, 'MyInventoryComponent')
+
+
+class InventoryRecord:
+    __slots__ = ('id', 'className', 'itemIds')
+    properties = ('InventoryItems',)
+
+    def __init__(self, gameobject):
+        self.id = gameobject['id']
+        self.className = intern_text(gameobject.get('class', ''))
+        self.itemIds = array('q', getPropertyValueByName(gameobject, 'InventoryItems') or [])
+
+
+class ItemStackRecord:
+    __slots__ = ('id', 'className', 'quantity', 'blueprint', 'isEngram', 'isSpecial')
+    properties = ('ItemQuantity', 'bIsBlueprint', 'bIsEngram', 'bAllowRemovalFromInventory')
+
+    def __init__(self, gameobject):
+        self.id = gameobject['id']
+        self.className = intern_text(gameobject['class'])
+        self.quantity = getPropertyValueByName(gameobject, 'ItemQuantity') or 1
+        self.blueprint = getPropertyValueByName(gameobject, 'bIsBlueprint')
+        self.isEngram = bool(isEngram(gameobject))
+        self.isSpecial = bool(isSpecialInventoryItem(gameobject))
+
+
+class TameRecord:
+    __slots__ = ('id', 'className', 'x', 'y', 'z', 'inCryopod', 'tamedName', 'tamerString',
+                 'owningPlayerName', 'tribeName', 'statusId')
+    properties = ('TamedName', 'TamerString', 'OwningPlayerName', 'TribeName', 'MyCharacterStatusComponent')
+
+    def __init__(self, gameobject):
+        self.id = gameobject['id']
+        self.className = intern_text(gameobject['class'])
+        (self.x, self.y, self.z) = locationOf(gameobject)
+        self.inCryopod = any("PrimalItem_WeaponEmptyCryopod" in name for name in gameobject.get('names', []))
+        self.tamedName = getPropertyValueByName(gameobject, 'TamedName')
+        self.tamerString = intern_text(getPropertyValueByName(gameobject, 'TamerString'))
+        self.owningPlayerName = intern_text(getPropertyValueByName(gameobject, 'OwningPlayerName'))
+        self.tribeName = intern_text(getPropertyValueByName(gameobject, 'TribeName'))
+        self.statusId = getPropertyValueByName(gameobject, 'MyCharacterStatusComponent')
+
+
+class DinoStatusRecord:
+    __slots__ = ('id', 'className', 'currentStatusValues', 'levelUpsWild', 'levelUpsTamed',
+                 'baseCharacterLevel', 'extraCharacterLevel', 'tamedIneffectiveness', 'imprintingQuality')
+    properties = ('CurrentStatusValues', 'NumberOfLevelUpPointsApplied', 'NumberOfLevelUpPointsAppliedTamed',
+                  'BaseCharacterLevel', 'ExtraCharacterLevel', 'TamedIneffectivenessModifier', 'DinoImprintingQuality')
+
+    def __init__(self, gameobject):
+        self.id = gameobject['id']
+        self.className = intern_text(gameobject['class'])
+        self.currentStatusValues = statusArray(gameobject, 'CurrentStatusValues', 'd')
+        self.levelUpsWild = statusArray(gameobject, 'NumberOfLevelUpPointsApplied', 'i')
+        self.levelUpsTamed = statusArray(gameobject, 'NumberOfLevelUpPointsAppliedTamed', 'i')
+        self.baseCharacterLevel = getPropertyValueByName(gameobject, 'BaseCharacterLevel')
+        self.extraCharacterLevel = getPropertyValueByName(gameobject, 'ExtraCharacterLevel')
+        self.tamedIneffectiveness = getPropertyValueByName(gameobject, 'TamedIneffectivenessModifier')
+        self.imprintingQuality = getPropertyValueByName(gameobject, 'DinoImprintingQuality')
+
+
+# The object types a report can ask for in its needs (see add_report), and
+# the records they're kept as.
+RECORD_CLASSES = {
+    "InventoryOwner": OwnerRecord,
+    "Inventory": InventoryRecord,
+    "ItemStack": ItemStackRecord,
+    "TameDinosaur": TameRecord,
+    "DinosaurStatus": DinoStatusRecord,
+}
+
+# identifyType needs these besides the PROPERTY_RULES names; see itemStackOrEngram.
+CLASSIFIER_PROPERTIES = ('bIsEngram',)
+
+CLASS_IN_RAW_JSON = re.compile(rb'"class"\s*:\s*"([^"\\]*)"')
+ID_IN_RAW_JSON = re.compile(rb'"id"\s*:\s*(-?\d+)')  # the converter writes the id first
+
+
+class ReportPlan:
+    """
+    Which game objects, and which of their properties, the selected reports
+    need.  Game objects nothing needs are skipped as early as possible:
+    from the raw json (class name and property names only, without parsing
+    it) where the parser has it, otherwise straight after parsing, before
+    any records are built.  Objects that are needed only keep the
+    properties the records and identifyType read.
+
+    Skipping is conservative: whenever the class name alone can't rule an
+    object out, it's parsed and classified as usual.
+    """
+    def __init__(self, reports):
+        self.reports = tuple(reports)
+        self.types = dict()  # object type -> list of class tests, or None for every class
+        for report in self.reports:
+            for (objtype, classTest) in REPORTS[report].needs:
+                if classTest is None or self.types.get(objtype, []) is None:
+                    self.types[objtype] = None
+                else:
+                    self.types.setdefault(objtype, []).append(classTest)
+        self.verdicts = dict()  # class name -> True, False, or the property names that would make it wanted
+        self.properties = set(name for (name, objtype) in PROPERTY_RULES) | set(CLASSIFIER_PROPERTIES)
+        for objtype in self.types:
+            self.properties.update(RECORD_CLASSES[objtype].properties)
+
+    def wants(self, objtype, className):
+        """ Whether a game object of this type and class is used by any selected report. """
+        if objtype not in self.types:
+            return False
+        classTests = self.types[objtype]
+        return classTests is None or any(classNameMatches(className, test, text) for (test, text) in classTests)
+
+    def verdict(self, className):
+        verdict = self.verdicts.get(className, None)
+        if verdict is None:
+            (decided, fallback) = classify_class_name(className)
+            if decided is not None:
+                possible = getattr(decided, 'types', None) if callable(decided) else (decided,)
+                verdict = possible is None or any(self.wants(objtype, className) for objtype in possible)
+            elif self.wants(fallback, className):
+                verdict = True
+            else:
+                verdict = tuple(name.encode('utf-8') for (name, objtype) in PROPERTY_RULES if self.wants(objtype, className)) or False
+            self.verdicts[className] = verdict
+        return verdict
+
+    def may_want(self, className, raw=None):
+        """
+        False only when no report can need a game object of this class,
+        whatever its properties.  raw is the object's json, if there is
+        any, to check the property rules' names against.
+        """
+        verdict = self.verdict(className)
+        if verdict is True or verdict is False:
+            return verdict
+        return raw is None or any(name in raw for name in verdict)
+
+    def may_want_raw(self, raw):
+        found = CLASS_IN_RAW_JSON.search(raw, 0, 1024)
+        return found is None or self.may_want(found.group(1).decode('utf-8'), raw)
+
+    def trim(self, gameobject):
+        """ Drops the properties none of the records or rules read. """
+        properties = gameobject.get('properties', None)
+        if properties:
+            gameobject['properties'] = [prop for prop in properties if prop['name'] in self.properties]
+        return gameobject
+
+
+class GameState:
+    """
+    Holds the sorted game objects of one save ahead of reporting.  These
+    used to be global variables; now every run gets its own, so several
+    maps can be worked on at once.  The reports only ever read it, so they
+    can run at the same time; see run_reports.
+    """
+    spill = None  # see SpilledGameState
+    plan = None  # a ReportPlan when only some reports are wanted
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """ Empties the maps so a fresh set of game objects can be read in. """
+        self.owners = dict()
+        self.inventories = dict()
+        self.itemstacks = dict()
+        self.miscellaneous = dict()
+        self.inventory_to_owner_reverse_lookup = dict()
+        self.tame_dinos = dict()
+        self.dino_status = dict()
+
+        # Where owners and tames are; see grid_add.
+        self.owner_cells = dict()
+        self.tame_cells = dict()
+
+        # How many game objects identifyType put in each category, for the metrics file.
+        self.object_type_counts = dict()
+
+        # Incremental mode only: content digest of each game object's raw json
+        # -> (id, type, class) as classified, so the next save can be compared.
+        self.object_digests = dict()
+
+    def game_objects(self):
+        """ The maps handle_object fills in, bundled up so they can be shipped elsewhere. """
+        return {
+            'owners': self.owners,
+            'inventories': self.inventories,
+            'itemstacks': self.itemstacks,
+            'miscellaneous': self.miscellaneous,
+            'inventory_to_owner_reverse_lookup': self.inventory_to_owner_reverse_lookup,
+            'tame_dinos': self.tame_dinos,
+            'dino_status': self.dino_status,
+            'owner_cells': self.owner_cells,
+            'tame_cells': self.tame_cells,
+            'object_type_counts': self.object_type_counts,
+            'object_digests': self.object_digests,
+        }
+
+    def merge(self, partial):
+        """
+        Folds maps from game_objects() into this state.  Merging partial
+        states in the order their objects appear in the file gives exactly
+        what reading the objects one after another would have: later ids
+        win, counts add up, and owner lists stay in file order.
+        """
+        self.owners.update(partial['owners'])
+        self.inventories.update(partial['inventories'])
+        self.itemstacks.update(partial['itemstacks'])
+        self.tame_dinos.update(partial['tame_dinos'])
+        self.dino_status.update(partial['dino_status'])
+        self.object_digests.update(partial.get('object_digests', {}))
+        for className, count in partial['miscellaneous'].items():
+            self.miscellaneous[className] = self.miscellaneous.get(className, 0) + count
+        for objtype, count in partial.get('object_type_counts', {}).items():
+            self.object_type_counts[objtype] = self.object_type_counts.get(objtype, 0) + count
+        for inventoryComponentId, ownerlist in partial['inventory_to_owner_reverse_lookup'].items():
+            self.inventory_to_owner_reverse_lookup.setdefault(inventoryComponentId, []).extend(ownerlist)
+        for cell, ids in partial['owner_cells'].items():
+            self.owner_cells.setdefault(cell, []).extend(ids)
+        for cell, ids in partial['tame_cells'].items():
+            self.tame_cells.setdefault(cell, []).extend(ids)
+
+    def copy(self):
+        """
+        A GameState with maps of its own, so one can be changed (as
+        process_game_objects_incremental does) while the other is still being
+        read.  The records are shared; nothing changes a record once it's made.
+        """
+        other = GameState()
+        for (name, value) in self.game_objects().items():
+            setattr(other, name, dict(value))
+        for name in ('inventory_to_owner_reverse_lookup', 'owner_cells', 'tame_cells'):
+            setattr(other, name, dict((key, list(ids)) for (key, ids) in getattr(self, name).items()))
+        return other
+
+
+class SpillTable:
+    """
+    Stands in for one of GameState's id -> record maps, but keeps the
+    records (pickled) in a table of the spill database instead of in
+    memory.  Only the dict operations the pipeline uses are here.  Records
+    are written in batches of SPILL_BATCH_ROWS; key_attribute, if given,
+    is copied into its own column so the inventory join can use it.  seq
+    numbers the records in the order they were first added, which is the
+    order a dict would keep them in; replacing a record keeps its place.
+    """
+    def __init__(self, db, name, key_attribute=None):
+        self.db = db
+        self.name = name
+        self.key_attribute = key_attribute
+        self.pending = dict()
+        self.added = 0
+        db.execute("CREATE TABLE {} (id INTEGER PRIMARY KEY, key, record BLOB, seq INTEGER)".format(name))
+
+    def rows(self, records):
+        for record in records:
+            key = getattr(record, self.key_attribute) if self.key_attribute else None
+            self.added += 1
+            yield (record.id, key, pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL), self.added)
+
+    def flush(self):
+        if self.pending:
+            self.db.executemany("INSERT INTO {} VALUES (?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET key = excluded.key, record = excluded.record".format(self.name),
+                                self.rows(self.pending.values()))
+            self.pending.clear()
+
+    def __setitem__(self, objectId, record):
+        self.pending[objectId] = record
+        if len(self.pending) >= SPILL_BATCH_ROWS:
+            self.flush()
+
+    def update(self, records):
+        for (objectId, record) in records.items():
+            self[objectId] = record
+
+    def get(self, objectId, default=None):
+        if objectId in self.pending:
+            return self.pending[objectId]
+        row = self.db.execute("SELECT record FROM {} WHERE id = ?".format(self.name), (objectId,)).fetchone()
+        return pickle.loads(row[0]) if row else default
+
+    def __getitem__(self, objectId):
+        record = self.get(objectId)
+        if record is None:
+            raise KeyError(objectId)
+        return record
+
+    def __contains__(self, objectId):
+        return self.get(objectId) is not None
+
+    def __len__(self):
+        self.flush()
+        return self.db.execute("SELECT COUNT(*) FROM {}".format(self.name)).fetchone()[0]
+
+    def __iter__(self):
+        self.flush()
+        return (row[0] for row in self.db.execute("SELECT id FROM {} ORDER BY id".format(self.name)))
+
+    def values(self):
+        self.flush()
+        return (pickle.loads(row[0]) for row in self.db.execute("SELECT record FROM {} ORDER BY id".format(self.name)))
+
+    def items(self):
+        return ((record.id, record) for record in self.values())
+
+
+class InventorySpillTable(SpillTable):
+    """ A SpillTable for inventories that also lists their item stack ids, in order, for the join. """
+    def __init__(self, db, name):
+        super().__init__(db, name)
+        db.execute("CREATE TABLE inventory_items (inventory_id INTEGER, position INTEGER, stack_id INTEGER)")
+
+    def flush(self):
+        if self.pending:
+            self.db.execute("DELETE FROM inventory_items WHERE inventory_id IN ({})".format(",".join("?" * len(self.pending))),
+                            list(self.pending))
+            self.db.executemany("INSERT INTO inventory_items VALUES (?, ?, ?)",
+                                ((inventory.id, position, stackId) for inventory in self.pending.values()
+                                 for (position, stackId) in enumerate(inventory.itemIds)))
+        super().flush()
+
+
+class SpilledGameState(GameState):
+    """
+    A GameState for saves too big for memory (--low-memory).  Owners,
+    inventories and item stacks, by far the biggest maps, go into a SQLite
+    file as they're read, and the inventory report's owner -> inventory ->
+    stack join is done there as one ordered query (see
+    iter_spilled_inventory_contents), so they never all have to be in
+    memory at once.  SQLite's page cache is held to memory_ceiling_mb;
+    sorts bigger than that go through temporary files.  Tames and their
+    status components stay in memory.
+
+    The reports come out exactly as from a GameState.  It can't be cached
+    or used incrementally; call close() when done to delete the file.
+    """
+    def __init__(self, spill_filename, memory_ceiling_mb=LOW_MEMORY_CEILING_MB):
+        self.spill_filename = spill_filename
+        self.memory_ceiling_mb = memory_ceiling_mb
+        super().__init__()
+
+    def clear(self):
+        self.close()
+        super().clear()
+        self.spill = sqlite3.connect(self.spill_filename)
+        self.spill.execute("PRAGMA journal_mode = OFF")  # scratch data; nothing to recover after a crash
+        self.spill.execute("PRAGMA synchronous = OFF")
+        self.spill.execute("PRAGMA temp_store = FILE")
+        self.spill.execute("PRAGMA cache_size = -{}".format(max(1, self.memory_ceiling_mb) * 1024))
+        self.owners = SpillTable(self.spill, "owners", key_attribute='inventoryId')
+        self.inventories = InventorySpillTable(self.spill, "inventories")
+        self.itemstacks = SpillTable(self.spill, "itemstacks")
+
+    def flush(self):
+        for table in (self.owners, self.inventories, self.itemstacks):
+            table.flush()
+
+    def close(self):
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
+        if os.path.exists(self.spill_filename):
+            os.remove(self.spill_filename)
+
+    def game_objects(self):
+        raise TypeError("A spilled game state can't be cached or shipped between processes")
+
+    def merge(self, partial):
+        # The owners table stands in for the inventory -> owners lookup.
+        super().merge(dict(partial, inventory_to_owner_reverse_lookup={}))
+
+
+def register_owner(state, owner):
     # Sometimes more than one owner points to the same
     # inventory, so we're creating a reverse lookup from
     # inventory to owners.  Key is inventoryComponentId; value is list [] of ownerIds.
-    ownerId = owner['id']
-    inventoryComponentId =  getPropertyValueByName(owner['properties'], 'MyInventoryComponent')
+    if state.spill is not None:
+        return  # the owners table in the spill database does this job
+    ownerId = owner.id
+    inventoryComponentId = owner.inventoryId
     if inventoryComponentId:
-        ownerlist = inventory_to_owner_reverse_lookup.get(inventoryComponentId, [])
+        ownerlist = state.inventory_to_owner_reverse_lookup.get(inventoryComponentId, [])
         ownerlist.append(ownerId)
-        inventory_to_owner_reverse_lookup[inventoryComponentId] = ownerlist
-
-
-def handle_object(gameobject):
-    global owners, inventories, itemstacks
+        state.inventory_to_owner_reverse_lookup[inventoryComponentId] = ownerlist
+
+
+def handle_object(state, gameobject):
+    plan = state.plan
+    if plan is not None and (gameobject is None or not plan.may_want(gameobject['class'])):
+        # Nothing selected needs it (None: ruled out before parsing); see ReportPlan.
+        state.object_type_counts["Skipped"] = state.object_type_counts.get("Skipped", 0) + 1
+        return "Skipped"
+    if plan is not None:
+        plan.trim(gameobject)
+    index_properties(gameobject)
     objtype = identifyType(gameobject)
+    state.object_type_counts[objtype] = state.object_type_counts.get(objtype, 0) + 1
+    if plan is not None and not plan.wants(objtype, gameobject['class']):
+        return objtype
 
     if (objtype == "InventoryOwner"):
-        owners[gameobject['id']] = gameobject
-        register_owner(gameobject)
+        owner = OwnerRecord(gameobject)
+        state.owners[owner.id] = owner
+        register_owner(state, owner)
+        grid_add(state.owner_cells, owner.id, owner.x, owner.y)
 
     if (objtype == "Inventory"):
-        inventories[gameobject['id']] = gameobject
+        state.inventories[gameobject['id']] = InventoryRecord(gameobject)
 
     if (objtype == "ItemStack"):
-        itemstacks[gameobject['id']] = gameobject
+        state.itemstacks[gameobject['id']] = ItemStackRecord(gameobject)
 
     if (objtype == "miscellaneous"):
-        miscellaneous[gameobject['class']] = miscellaneous.get(gameobject['class'], 0) + 1
+        state.miscellaneous[gameobject['class']] = state.miscellaneous.get(gameobject['class'], 0) + 1
 
     if (objtype == "TameDinosaur"):
-        tame_dinos[gameobject['id']] = gameobject
+        dino = TameRecord(gameobject)
+        state.tame_dinos[dino.id] = dino
+        grid_add(state.tame_cells, dino.id, dino.x, dino.y)
 
     if (objtype == "DinosaurStatus"):
-        dino_status[gameobject['id']] = gameobject
+        state.dino_status[gameobject['id']] = DinoStatusRecord(gameobject)
+
+    return objtype
+
+
+# A uniform grid over x/y: cells maps (column, row) to the ids of the
+# owners or tames standing in that square, so a location query only
+# looks at the squares it overlaps instead of every object on the map.
+
+def grid_cell(x, y):
+    return (math.floor(x / SPATIAL_CELL_SIZE), math.floor(y / SPATIAL_CELL_SIZE))
+
+def grid_add(cells, objectId, x, y):
+    if x == '' or y == '':
+        return  # no location in the save; nothing to index
+    cells.setdefault(grid_cell(x, y), []).append(objectId)
+
+def grid_remove(cells, objectId, x, y):
+    if x == '' or y == '':
+        return
+    cell = grid_cell(x, y)
+    ids = cells.get(cell, [])
+    if objectId in ids:
+        ids.remove(objectId)
+    if not ids:
+        cells.pop(cell, None)
+
+def grid_candidates(cells, xmin, ymin, xmax, ymax):
+    """
+    Ids in every cell the box touches.  Some of them will be just outside
+    the box; the caller checks the exact position.
+    """
+    (columnMin, rowMin) = grid_cell(xmin, ymin)
+    (columnMax, rowMax) = grid_cell(xmax, ymax)
+    if (columnMax - columnMin + 1) * (rowMax - rowMin + 1) > len(cells):
+        # A box bigger than the occupied part of the map; cheaper to go through what's there.
+        touched = [cell for cell in cells if columnMin <= cell[0] <= columnMax and rowMin <= cell[1] <= rowMax]
+    else:
+        touched = [(column, row) for column in range(columnMin, columnMax + 1) for row in range(rowMin, rowMax + 1)
+                   if (column, row) in cells]
+    for cell in touched:
+        yield from cells[cell]
+
+def records_in_box(records, cells, xmin, ymin, xmax, ymax):
+    """ The records (owners or tames, by id) inside the box, in id order. """
+    found = []
+    for objectId in grid_candidates(cells, xmin, ymin, xmax, ymax):
+        record = records.get(objectId, None)
+        if record is not None and xmin <= record.x <= xmax and ymin <= record.y <= ymax:
+            found.append(record)
+    found.sort(key=lambda record: record.id)
+    return found
+
+def records_near(records, cells, x, y, radius):
+    """ The records within radius of x, y (measured across the map; height is ignored), in id order. """
+    return [record for record in records_in_box(records, cells, x - radius, y - radius, x + radius, y + radius)
+            if (record.x - x) ** 2 + (record.y - y) ** 2 <= radius ** 2]
+
+def owners_near(state, x, y, radius):
+    """ Storage, generators and anything else with an inventory within radius of x, y. """
+    return records_near(state.owners, state.owner_cells, x, y, radius)
+
+def owners_in_box(state, xmin, ymin, xmax, ymax):
+    return records_in_box(state.owners, state.owner_cells, xmin, ymin, xmax, ymax)
+
+def generators_in_box(state, xmin, ymin, xmax, ymax):
+    """ Electric generators inside a base's bounding box. """
+    return [owner for owner in owners_in_box(state, xmin, ymin, xmax, ymax) if simplifyName(owner.className) == "ElectricGenerator"]
+
+def tames_near(state, x, y, radius):
+    return records_near(state.tame_dinos, state.tame_cells, x, y, radius)
+
+def tames_in_box(state, xmin, ymin, xmax, ymax):
+    return records_in_box(state.tame_dinos, state.tame_cells, xmin, ymin, xmax, ymax)
+
+def tames_outside_troughs(state, radius=FEEDING_TROUGH_RADIUS):
+    """
+    Real tames (no rafts, nothing in a cryopod) with no feeding trough
+    within radius, i.e. the ones that won't be fed while nobody's around.
+    Troughs are anything with an inventory and Trough in its class name.
+    """
+    troughs = dict()
+    trough_cells = dict()
+    for owner in state.owners.values():
+        if "Trough" in owner.className and owner.x != '':
+            troughs[owner.id] = owner
+            grid_add(trough_cells, owner.id, owner.x, owner.y)
+    outside = []
+    for dino in state.tame_dinos.values():
+        if dino.className in not_really_dinos or dino.inCryopod or dino.x == '':
+            continue
+        if not records_near(troughs, trough_cells, dino.x, dino.y, radius):
+            outside.append(dino)
+    return outside
 
 
 def simplifyName(text):
@@ -149,10 +872,9 @@ def simplifyName(text):
         text = text[:-2]
     return text
 
-def report_low_fuel_generators(low_fuel_filename):
-    header = "x\ty\tz\tPlayer\tFuel\n"
-    with open(low_fuel_filename, "w") as outfile:
-        outfile.write(header)
+def report_low_fuel_generators(state, low_fuel_filename):
+    with ReportWriter(low_fuel_filename, ["x", "y", "z", "Player", "Fuel"]) as writer:
+        generatorFuel = tally_generator_fuel(state)
         for location in generatorFuel:
             fuelPercent = 100.0 * generatorFuel.get(location) / 800.0
             pieces = location.split()
@@ -163,83 +885,564 @@ def report_low_fuel_generators(low_fuel_filename):
                 player = pieces[3]
             else:
                 player = ""
-            outfile.write(x + "\t" + y + "\t" + z + "\t" + player + "\t" + "{:2.1f}%\n".format(fuelPercent))
+            writer.row(x, y, z, player, "{:2.1f}%".format(fuelPercent))
 
     return low_fuel_filename # not strictly necessary but following my standard elsewhere
 
 
-def increaseFuelQuantityAtLocation(x, y, z, player, quantityInStack):
+def increaseFuelQuantityAtLocation(generatorFuel, x, y, z, player, quantityInStack):
     key = x + " " + y + " " + z + " " + player
     currentQuantity = generatorFuel.get(key, 0)
     generatorFuel[key] = currentQuantity + quantityInStack
 
 
+def tally_generator_fuel(state):
+    """
+    Adds up the gasoline in every generator, per location and player, in
+    inventory report order.  Returns a dict of "x y z player" -> quantity.
+    """
+    generatorFuel = dict()
+    for (owner, inventoryObject, stacks) in iter_inventory_contents(state):
+        if simplifyName(owner.className) != "ElectricGenerator":
+            continue
+        who = coalesce(owner.owningPlayerName, owner.playerName,  owner.ownerName, "UnknownOwner")
+        for stack in stacks:
+            if simplifyName(stack.className) == "Gasoline":
+                increaseFuelQuantityAtLocation(generatorFuel, str(owner.x), str(owner.y), str(owner.z), who.replace(' ', '_'), stack.quantity)
+    return generatorFuel
+
+
 def coalesce(*arg):
     """ Returns the first non-empty argument of the parameters """
     return reduce(lambda x, y: x if x is not None and x.strip() is not "" else y, arg)
 
-def report_inventories(inventory_filename):
-    with open(inventory_filename, "w") as outfile:
-        # We're denormalizing here; producing a flat list out of hierarchical objects.
-        header = "OwnerID\tInventoryOwnerClass\tx\ty\tz\tOwnerName\tOwningPlayerName\tOwningTameName\tTribeName\tInventoryID\tInventoryClass\tInventoryStackItemType\tStackQuantity\tBlueprint\n"
-        outfile.write(header)
-
-        for inventoryComponentId in inventory_to_owner_reverse_lookup:
-            inventoryObject = inventories.get(inventoryComponentId, None)
-            if not inventoryObject:
-                continue  # skip any we can't find which are usually leashes and other misclassified things.
-
-            # Some inventories have more than one owner because of serialization quirks. They're 
-            # all the same data except id, so literally just pick any instance if there are two or more.
-            owner = owners[inventory_to_owner_reverse_lookup[inventoryComponentId][0]]
-
-            identifierColumns = str(owner['id']) + \
-                "\t" + simplifyName(owner['class']) + \
-                "\t" + str(owner['location']['x']) + \
-                "\t" + str(owner['location']['y']) + \
-                "\t" + str(owner['location']['z']) + \
-                "\t" + getPropertyValueByName(owner['properties'], 'OwnerName') + \
-                "\t" + getPropertyValueByName(owner['properties'], 'OwningPlayerName')  + getPropertyValueByName(owner['properties'], 'PlayerName') + \
-                "\t" + getPropertyValueByName(owner['properties'], 'TameName') + \
-                "\t" + getPropertyValueByName(owner['properties'], 'TribeName') + \
-                "\t" + str(inventoryObject['id']) + \
-                "\t" + simplifyName(inventoryObject.get('class', ''))
-            who = coalesce(getPropertyValueByName(owner['properties'], 'OwningPlayerName'), getPropertyValueByName(owner['properties'], 'PlayerName'),  getPropertyValueByName(owner['properties'], 'OwnerName'), "UnknownOwner")
-
-            stackIds = getPropertyValueByName(inventoryObject['properties'], 'InventoryItems')
-            stacks = dict()
-            for stackId in stackIds:
-                stack = itemstacks.get(stackId, None)
-                if stack and not isEngram(stack) and not isSpecialInventoryItem(stack):
-                    itemName = simplifyName(stack['class'])
-                    itemQuantity = getPropertyValueByName(stack['properties'], 'ItemQuantity') or 1
-                    if (simplifyName(owner['class']) == "ElectricGenerator" and itemName == "Gasoline"):
-                        increaseFuelQuantityAtLocation(str(owner['location']['x']), 
-                                str(owner['location']['y']), 
-                                str(owner['location']['z']), 
-                                who.replace(' ', '_'),
-                                itemQuantity)
-                    bisBlueprint = str(getPropertyValueByName(stack['properties'], 'bIsBlueprint'))
-                    outfile.write(identifierColumns + "\t" + itemName + "\t" + str(itemQuantity) + "\t" + ("Blueprint" if bisBlueprint else "Item") + "\n")
+def iter_spilled_inventory_contents(state):
+    """
+    iter_inventory_contents for a SpilledGameState, as a single query over
+    the spill database.  Each inventory goes with the first owner added
+    for it and comes in the order those owners were added (their seq; see
+    SpillTable), and the stacks come in InventoryItems order, which is the
+    order the in-memory join gives.
+    """
+    state.flush()
+    # SQLite fills in the bare owner id from the row MIN(seq) picked.
+    rows = state.spill.execute("""
+        SELECT first.owner_id, owners.record, inventories.id, inventories.record, itemstacks.record
+        FROM (SELECT key AS inventory_id, MIN(seq) AS owner_seq, id AS owner_id FROM owners
+              WHERE key IS NOT NULL AND key != 0 GROUP BY key) AS first
+        JOIN owners ON owners.id = first.owner_id
+        JOIN inventories ON inventories.id = first.inventory_id
+        LEFT JOIN inventory_items ON inventory_items.inventory_id = inventories.id
+        LEFT JOIN itemstacks ON itemstacks.id = inventory_items.stack_id
+        ORDER BY first.owner_seq, inventory_items.position
+    """)
+    current = None
+    for (ownerId, ownerRecord, inventoryId, inventoryRecord, stackRecord) in rows:
+        if current is None or current[0].id != ownerId:
+            if current is not None:
+                yield current
+            current = (pickle.loads(ownerRecord), pickle.loads(inventoryRecord), [])
+        if stackRecord is not None:
+            stack = pickle.loads(stackRecord)
+            if not stack.isEngram and not stack.isSpecial:
+                current[2].append(stack)
+    if current is not None:
+        yield current
+
+def iter_inventory_contents(state):
+    """
+    Walks the owner -> inventory -> item stack join the inventory report
+    is built from.  Yields (owner, inventory, stacks) in report order, where
+    stacks are the ones that show up in the report: no engrams and none of
+    the hidden default items.
+    """
+    if state.spill is not None:
+        yield from iter_spilled_inventory_contents(state)
+        return
+    for inventoryComponentId in state.inventory_to_owner_reverse_lookup:
+        inventoryObject = state.inventories.get(inventoryComponentId, None)
+        if not inventoryObject:
+            continue  # skip any we can't find which are usually leashes and other misclassified things.
+
+        # Some inventories have more than one owner because of serialization quirks. They're 
+        # all the same data except id, so literally just pick any instance if there are two or more.
+        owner = state.owners[state.inventory_to_owner_reverse_lookup[inventoryComponentId][0]]
+
+        stacks = []
+        for stackId in inventoryObject.itemIds:
+            stack = state.itemstacks.get(stackId, None)
+            if stack and not stack.isEngram and not stack.isSpecial:
+                stacks.append(stack)
+        yield (owner, inventoryObject, stacks)
+
+def report_inventories(state, inventory_filename):
+    # We're denormalizing here; producing a flat list out of hierarchical objects.
+    header = ["OwnerID", "InventoryOwnerClass", "x", "y", "z", "OwnerName", "OwningPlayerName", "OwningTameName", "TribeName",
+              "InventoryID", "InventoryClass", "InventoryStackItemType", "StackQuantity", "Blueprint"]
+    with ReportWriter(inventory_filename, header) as writer:
+        for (owner, inventoryObject, stacks) in iter_inventory_contents(state):
+            identifierColumns = "\t".join((str(owner.id), simplifyName(owner.className),
+                str(owner.x), str(owner.y), str(owner.z),
+                owner.ownerName, owner.owningPlayerName + owner.playerName, owner.tameName, owner.tribeName,
+                str(inventoryObject.id), simplifyName(inventoryObject.className)))
+
+            for stack in stacks:
+                bisBlueprint = str(stack.blueprint)
+                writer.row(identifierColumns, simplifyName(stack.className), str(stack.quantity), "Blueprint" if bisBlueprint else "Item")
     return inventory_filename
 
-def load_values_json():
-    print("Loading values.json into memory")
+def build_item_index(state):
+    """ An ItemIndex of every stack the inventory report lists. """
+    item_index = ItemIndex()
+    for (owner, inventoryObject, stacks) in iter_inventory_contents(state):
+        who = coalesce(owner.owningPlayerName, owner.playerName,  owner.ownerName, "UnknownOwner")
+        for stack in stacks:
+            item_index.add(owner, inventoryObject, stack, simplifyName(stack.className), who)
+    return item_index
+
+class ItemIndex:
+    """
+    Inverted index from item (the simplified class name the inventory
+    report shows) to every stack of it: who holds it, where, and how
+    many, plus running totals per tribe and per player.  build_item_index
+    fills it in from the same stacks as the inventory report, and write() saves it as
+    MyMap_items.sqlite for find_item and item_totals to answer from later
+    without the save.
+    """
+    def __init__(self):
+        self.holdings = []
+        self.tribe_totals = dict()
+        self.player_totals = dict()
+
+    def add(self, owner, inventoryObject, stack, itemName, who):
+        (x, y, z) = (None if value == '' else value for value in (owner.x, owner.y, owner.z))
+        self.holdings.append((itemName, owner.id, simplifyName(owner.className), x, y, z,
+                              owner.tribeName, who, inventoryObject.id, stack.quantity, int(bool(stack.blueprint))))
+        for (totals, key) in ((self.tribe_totals, owner.tribeName), (self.player_totals, who)):
+            (quantity, stacks) = totals.get((itemName, key), (0, 0))
+            totals[(itemName, key)] = (quantity + stack.quantity, stacks + 1)
+
+    def write(self, index_filename):
+        temporary_filename = index_filename + ".tmp"
+        if os.path.exists(temporary_filename):
+            os.remove(temporary_filename)
+        db = sqlite3.connect(temporary_filename)
+        try:
+            db.executescript("""
+                CREATE TABLE meta (version INTEGER);
+                CREATE TABLE items (item TEXT PRIMARY KEY, quantity INTEGER, stacks INTEGER);
+                CREATE TABLE holdings (item TEXT, owner_id INTEGER, owner_class TEXT, x REAL, y REAL, z REAL,
+                                       tribe TEXT, player TEXT, inventory_id INTEGER, quantity INTEGER, blueprint INTEGER);
+                CREATE TABLE tribe_totals (item TEXT, tribe TEXT, quantity INTEGER, stacks INTEGER, PRIMARY KEY (item, tribe));
+                CREATE TABLE player_totals (item TEXT, player TEXT, quantity INTEGER, stacks INTEGER, PRIMARY KEY (item, player));
+            """)
+            db.execute("INSERT INTO meta VALUES (?)", (ITEM_INDEX_VERSION,))
+            db.executemany("INSERT INTO holdings VALUES (?,?,?,?,?,?,?,?,?,?,?)", self.holdings)
+            db.executemany("INSERT INTO tribe_totals VALUES (?,?,?,?)",
+                           [(item, tribe, quantity, stacks) for ((item, tribe), (quantity, stacks)) in self.tribe_totals.items()])
+            db.executemany("INSERT INTO player_totals VALUES (?,?,?,?)",
+                           [(item, player, quantity, stacks) for ((item, player), (quantity, stacks)) in self.player_totals.items()])
+            db.execute("INSERT INTO items SELECT item, SUM(quantity), SUM(stacks) FROM tribe_totals GROUP BY item")
+            db.execute("CREATE INDEX holdings_by_item ON holdings (item)")
+            db.commit()
+        finally:
+            db.close()
+        os.replace(temporary_filename, index_filename)
+        return index_filename
+
+
+def open_item_index(index_filename):
+    if not os.path.isfile(index_filename):
+        raise FileNotFoundError("No item index at {}; run the script on the save first.".format(index_filename))
+    db = sqlite3.connect(index_filename)
+    try:
+        version = db.execute("SELECT version FROM meta").fetchone()
+    except sqlite3.DatabaseError:
+        version = None
+    if not version or version[0] != ITEM_INDEX_VERSION:
+        db.close()
+        raise ValueError("{} was written by a different version of the script; run it on the save again.".format(index_filename))
+    return db
+
+
+def matching_items(db, name):
+    """ Item names containing name (case-insensitive), or just the one if it matches exactly. """
+    exact = db.execute("SELECT item FROM items WHERE item = ? COLLATE NOCASE", (name,)).fetchall()
+    if exact:
+        return [row[0] for row in exact]
+    return [row[0] for row in db.execute("SELECT item FROM items WHERE instr(lower(item), lower(?)) > 0 ORDER BY item", (name,))]
+
+
+def find_item(index_filename, name):
+    """
+    Every stack of the items matching name, from MyMap_items.sqlite: a
+    list of dicts with the item, who holds it and where, and how many.
+    """
+    db = open_item_index(index_filename)
+    try:
+        rows = []
+        for item in matching_items(db, name):
+            cursor = db.execute("SELECT * FROM holdings WHERE item = ? ORDER BY rowid", (item,))
+            columns = [column[0] for column in cursor.description]
+            rows.extend(dict(zip(columns, row)) for row in cursor)
+        return rows
+    finally:
+        db.close()
+
+
+def item_totals(index_filename, name, by='tribe'):
+    """
+    How much of each item matching name every tribe (by='tribe') or
+    player (by='player') has: a list of (item, tribe or player, quantity,
+    stacks), biggest first.
+    """
+    if by not in ('tribe', 'player'):
+        raise ValueError("by must be tribe or player")
+    db = open_item_index(index_filename)
+    try:
+        totals = []
+        for item in matching_items(db, name):
+            totals.extend(db.execute("SELECT item, {0}, quantity, stacks FROM {0}_totals WHERE item = ? "
+                                     "ORDER BY quantity DESC, {0}".format(by), (item,)).fetchall())
+        return totals
+    finally:
+        db.close()
+
+
+def print_item_lookup(ark_binary_filename, name, by=None):
+    """ --find-item: prints the answer from MyMap_items.sqlite as tab-separated lines. """
+    index_filename = ark_binary_filename.replace(".ark", "_items.sqlite")
+    if by:
+        totals = item_totals(index_filename, name, by)
+        print("Item\t" + by.capitalize() + "\tQuantity\tStacks")
+        for (item, key, quantity, stacks) in totals:
+            print("{}\t{}\t{}\t{}".format(item, key, quantity, stacks))
+        return
+    rows = find_item(index_filename, name)
+    print("Item\tOwnerID\tInventoryOwnerClass\tx\ty\tz\tTribeName\tPlayer\tInventoryID\tStackQuantity\tBlueprint")
+    for row in rows:
+        print("\t".join("" if row[column] is None else str(row[column]) for column in
+                        ('item', 'owner_id', 'owner_class', 'x', 'y', 'z', 'tribe', 'player', 'inventory_id', 'quantity'))
+              + "\t" + ("Blueprint" if row['blueprint'] else "Item"))
+
+
+class ReportWriter:
+    """
+    Writes a tab-separated report: a header line, then one line per row.
+    Rows are held and written out REPORT_BUFFER_ROWS at a time rather
+    than one write per line.  Columns have to be text already.  A filename
+    ending in .gz or .zst is compressed as it's written; see
+    open_text_output.
+
+        with ReportWriter(filename, ["x", "y", "z"]) as writer:
+            writer.row(str(x), str(y), str(z))
+    """
+    def __init__(self, filename, header, buffer_rows=REPORT_BUFFER_ROWS):
+        self.filename = filename
+        self.buffer_rows = buffer_rows
+        self.lines = ["\t".join(header)]
+        self.outfile = open_text_output(filename)
+
+    def row(self, *columns):
+        self.lines.append("\t".join(columns))
+        if len(self.lines) >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            self.outfile.write("\n".join(self.lines) + "\n")
+            self.lines = []
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.outfile.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReportPlugin:
+    """
+    One report main_conversion can write; see add_report.  The reports
+    only read the state, never change it, so any number of them can run
+    at once.
+    """
+    def __init__(self, name, write, needs, suffix, objects=None, uses_values=False, cluster=False):
+        self.name = name
+        self.write = write
+        self.needs = list(needs)
+        self.suffix = suffix
+        self.objects = objects
+        self.uses_values = uses_values
+        self.cluster = cluster
+        self.stage = suffix.lstrip("_").split(".")[0]  # its name in MyMap_metrics.json
+
+    def filename(self, ark_binary_filename, codec=None):
+        """ Where the report goes; text reports get compressed with codec, if there is one. """
+        filename = ark_binary_filename.replace(".ark", self.suffix)
+        return compressed_filename(filename, codec) if self.suffix.endswith(".txt") else filename
+
+
+# The registered reports by name, in the order they're listed and run.
+REPORTS = dict()
+
+def add_report(name, write, needs, suffix=None, objects=None, uses_values=False, cluster=False):
+    """
+    Registers a report, so every run writes it (or --reports picks it)
+    without main_conversion having to know about it.  Registering a name
+    again replaces that report.
+
+    write(state, filename, context) writes the report from state, a
+    GameState, which it must only read: the reports run at the same time.
+    ReportWriter (or open_text_output) takes care of compressing it if
+    filename asks for that.
+    context is a dict with the server 'multipliers', the species table
+    'values_by_bp' (only loaded when some report says uses_values=True)
+    and 'objects', an ObjectIndex to fetch whole game objects from by id
+    when a report wants more of one than the state keeps (None if there's
+    no index, as with --delete-intermediates).
+
+    needs lists the game objects the report reads as (object type, class
+    test) pairs: the type is one of RECORD_CLASSES, and the class test
+    narrows it down to some class names the way the rule tables do, like
+    ("contains", "Gasoline"), or is None for all of them.  When only some
+    reports are run, nothing else is read; see ReportPlan.
+
+    suffix is what goes in place of .ark in the report's filename (default
+    _<name>.txt), objects(state) how many things it went through, for the
+    metrics, and cluster=True has --batch merge it across the maps.
+    """
+    for (objtype, classTest) in needs:
+        if objtype not in RECORD_CLASSES:
+            raise ValueError("A report can only need {}, not {}".format(", ".join(RECORD_CLASSES), objtype))
+    REPORTS[name] = ReportPlugin(name, write, needs, suffix or "_{}.txt".format(name), objects, uses_values, cluster)
+    return REPORTS[name]
+
+def report_names():
+    return tuple(REPORTS)
+
+add_report('inventory', lambda state, filename, context: report_inventories(state, filename),
+           [("InventoryOwner", None), ("Inventory", None), ("ItemStack", None)],
+           objects=lambda state: len(state.itemstacks), cluster=True)
+add_report('items', lambda state, filename, context: build_item_index(state).write(filename),
+           [("InventoryOwner", None), ("Inventory", None), ("ItemStack", None)],
+           suffix="_items.sqlite", objects=lambda state: len(state.itemstacks))
+add_report('hungry', lambda state, filename, context: report_hungry_tames(state, filename, context['multipliers'], context['values_by_bp']),
+           [("TameDinosaur", None), ("DinosaurStatus", None)],
+           suffix="_hungry_tames.txt", objects=lambda state: len(state.tame_dinos), uses_values=True, cluster=True)
+add_report('fuel', lambda state, filename, context: report_low_fuel_generators(state, filename),
+           [("InventoryOwner", ("contains", "ElectricGenerator")), ("Inventory", None), ("ItemStack", ("contains", "Gasoline"))],
+           suffix="_low_fuel.txt", objects=lambda state: len(state.owners))
+
+
+def run_reports(state, reports, ark_binary_filename, context, metrics, codec=None):
+    """
+    Writes the named reports from state, all at the same time, each in
+    its own thread and timed as its own stage in metrics.  They share the
+    state read-only, so nothing gets copied; the threads mostly overlap
+    their file writing and numpy work.  In low-memory mode they take turns
+    instead, since the spill database can only be used from one thread.
+    codec compresses the text reports; see choose_codec.
+    Returns the filenames written, by report name.
+    """
+    plugins = [REPORTS[name] for name in reports]
+
+    def run(plugin):
+        filename = plugin.filename(ark_binary_filename, codec)
+        reads = ['values.json'] if plugin.uses_values else []
+        with metrics.stage(plugin.stage, reads=reads, writes=[filename], threaded=True) as stage:
+            plugin.write(state, filename, context)
+            stage.objects = plugin.objects(state) if plugin.objects else None
+        print("    Wrote {}".format(filename), flush=True)
+        return filename
+
+    if state.spill is not None or len(plugins) < 2:
+        filenames = [run(plugin) for plugin in plugins]
+    else:
+        with ThreadPoolExecutor(max_workers=len(plugins)) as executor:
+            filenames = list(executor.map(run, plugins))
+    return dict(zip(reports, filenames))
+
+
+def load_report_plugins(plugin_paths):
+    """
+    Imports modules that register more reports with add_report: either
+    python files (path/to/breeding_report.py) or importable module names.
+    A module that's already loaded isn't run again.
+    """
+    sys.modules.setdefault("ConvertAndAnalyzeArkSave", sys.modules[__name__])  # plugins import us by name, even when we're __main__
+    for plugin_path in plugin_paths or ():
+        if plugin_path.endswith(".py"):
+            module_name = "ark_report_plugin_" + re.sub(r'\W', '_', os.path.abspath(plugin_path))
+            if module_name in sys.modules:
+                continue
+            spec = importlib.util.spec_from_file_location(module_name, plugin_path)
+            if spec is None:
+                raise ImportError("Can't load a report plugin from {}".format(plugin_path))
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            try:
+                spec.loader.exec_module(module)
+            except BaseException:
+                del sys.modules[module_name]
+                raise
+        else:
+            importlib.import_module(plugin_path)
+
 
-    with open('values.json') as f:
+def species_entry(species):
+    """ The only parts of a values.json species the stat calculations use. """
+    return {
+        'fullStatsRaw': species['fullStatsRaw'],
+        'TamedBaseHealthMultiplier': species.get('TamedBaseHealthMultiplier', 1.0),
+    }
+
+def compile_values_json(values_filename='values.json'):
+    """
+    Reads values.json and splits its species into the PrimalEarth ones
+    (what the reports have always used) and everything else (DLC maps and
+    mods), each keyed by blueprint short name like "Ptero_Character_BP_C".
+    When two species share a short name, the last one wins.  Species
+    without a usable blueprint path or stats (mods get these wrong now and
+    then) are left out.
+    """
+    print("Loading {} into memory".format(values_filename))
+    with open(values_filename) as f:
         valuesdata = json.load(f)
 
-    values_by_bp = dict()
+    primal = dict()
+    others = dict()
+    skipped = 0
     for species in valuesdata['species']:
-        if PRIMALEARTH in species['blueprintPath']:
-            shortname = species['blueprintPath'].split(".")[1]
-            values_by_bp[shortname + "_C"] = species
-
-    return values_by_bp
+        try:
+            shortname = species['blueprintPath'].split(".")[1] + "_C"
+            section = primal if PRIMALEARTH in species['blueprintPath'] else others
+            section[shortname] = species_entry(species)
+        except (KeyError, IndexError, TypeError, AttributeError):
+            skipped += 1
+    if skipped:
+        print("    Skipped {} species in {} that have no blueprint path or stats.".format(skipped, values_filename))
+    return (primal, others)
+
+
+class SpeciesValues:
+    """
+    Species stats by blueprint short name, as load_values_json returns them.
+    Looks like a dict to the stat calculations.  PrimalEarth species are
+    there from the start; the rest only get read out of the species index
+    the first time a save asks for one that isn't a PrimalEarth species.
+    """
+    def __init__(self, primal, others=None, index_filename=None, others_offset=None):
+        self.primal = primal
+        self.others = others
+        self.index_filename = index_filename
+        self.others_offset = others_offset
+
+    def load_others(self):
+        if self.others is None:
+            with open(self.index_filename, 'rb') as data:
+                data.seek(self.others_offset)
+                self.others = _StateUnpickler(data).load()
+        return self.others
+
+    def get(self, className, default=None):
+        entry = self.primal.get(className, None)
+        if entry is None:
+            entry = self.load_others().get(className, None)
+        return default if entry is None else entry
+
+    def __contains__(self, className):
+        return self.get(className) is not None
+
+    def __getitem__(self, className):
+        entry = self.get(className)
+        if entry is None:
+            raise KeyError(className)
+        return entry
+
+    def items(self):
+        """ Only what has been loaded so far; other species show up once asked for. """
+        yield from self.primal.items()
+        for (className, entry) in (self.others or {}).items():
+            if className not in self.primal:
+                yield (className, entry)
+
+    def __len__(self):
+        return sum(1 for item in self.items())
+
+
+def save_species_index(index_filename, fingerprint, primal, others):
+    """
+    Writes the compiled species: a small header, then the PrimalEarth
+    species, then everything else, so a run that only meets PrimalEarth
+    tames never reads that last part.
+    """
+    primal_data = pickle.dumps(primal, protocol=pickle.HIGHEST_PROTOCOL)
+    header = {'version': SPECIES_INDEX_VERSION, 'fingerprint': fingerprint, 'primalLength': len(primal_data)}
+    temporary_filename = index_filename + ".tmp"
+    with open(temporary_filename, 'wb') as outfile:
+        pickle.dump(header, outfile, protocol=pickle.HIGHEST_PROTOCOL)
+        outfile.write(primal_data)
+        pickle.dump(others, outfile, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_filename, index_filename)
+
+def load_species_index(index_filename, values_filename):
+    """
+    Returns SpeciesValues from the species index if it was compiled from
+    values.json as it is now, or None.  A values.json that was only touched
+    (same content, new mtime) is fine; its index gets the new mtime.
+    """
+    if not os.path.isfile(index_filename):
+        return None
+    try:
+        with open(index_filename, 'rb') as data:
+            header = _StateUnpickler(data).load()
+            if header.get('version') != SPECIES_INDEX_VERSION:
+                return None
+            cached = header['fingerprint']
+            current = save_fingerprint(values_filename, with_hash=False)
+            touched = cached['size'] != current['size'] or cached['mtime'] != current['mtime']
+            if touched:
+                current = save_fingerprint(values_filename)
+                if cached['sha256'] != current['sha256']:
+                    return None
+            primal = _StateUnpickler(data).load()
+            others_offset = data.tell()
+    except (OSError, EOFError, KeyError, pickle.UnpicklingError) as e:
+        print("    Ignoring unreadable species index {}: {}".format(index_filename, e))
+        return None
+    species = SpeciesValues(primal, index_filename=index_filename, others_offset=others_offset)
+    if touched:
+        save_species_index(index_filename, current, primal, species.load_others())
+        species.others_offset = None  # already loaded, and the file has been rewritten
+    return species
+
+def load_values_json(values_filename='values.json', index_filename=SPECIES_INDEX_FILENAME):
+    """
+    Species stats from ArkSmartBreeding's values.json, keyed by blueprint
+    short name.  Parsing that file is slow and nearly all of it is ignored,
+    so the parts we use are compiled into a species index next to it the
+    first time, and later runs load the index instead until values.json
+    changes.
+    """
+    species = load_species_index(index_filename, values_filename)
+    if species is not None:
+        return species
+    (primal, others) = compile_values_json(values_filename)
+    try:
+        save_species_index(index_filename, save_fingerprint(values_filename), primal, others)
+    except OSError as e:
+        print("    Couldn't write the species index {}: {}".format(index_filename, e))
+    return SpeciesValues(primal, others)
 
 
 
-def calculate_food_total(dino, valuesjson_entry, base_character_level, extra_character_level, food_levelups_wild, food_levelups_tame):
+def calculate_food_total(state, dino, valuesjson_entry, base_character_level, extra_character_level, food_levelups_wild, food_levelups_tame, multipliers=None):
     """
     Calculation formula for this is based on the excellent notes on Ark's wiki:
     https://ark.gamepedia.com/Creature_Stats_Calculation
@@ -250,17 +1453,20 @@ def calculate_food_total(dino, valuesjson_entry, base_character_level, extra_cha
     Under the fullStatsRaw, the order in a row is "Base (B), wildLevel (Iw), tamedLevel (Id), 
     tamingAdd (Ta), tamingAffinity (Tm?)"
     and the order of the rows should match the normal stat order for the 12 stats.
+
+    multipliers holds the server's IwM, TmM, IdM, TaM and IBM settings (see
+    DEFAULT_SERVER_MULTIPLIERS, which is what you get without it).
     """
     if not valuesjson_entry:
-        print("Error! No json entry matched for dino of class " + dino['class'] + " -- check name matching logic.")
+        print("Error! No json entry matched for dino of class " + dino.className + " -- check name matching logic.")
         return 0
 
-    statusComponentId =  getPropertyValueByName(dino['properties'], 'MyCharacterStatusComponent')
+    statusComponentId = dino.statusId
     if not statusComponentId:
         print("Error! Couldn't find status component. Coding bug?")
         return 0
 
-    statusComponent = dino_status[statusComponentId]
+    statusComponent = state.dino_status[statusComponentId]
 
 
     # Calculation Example
@@ -302,27 +1508,28 @@ def calculate_food_total(dino, valuesjson_entry, base_character_level, extra_cha
     Id = foodStatValues[2]
     Ta = foodStatValues[3]
     Tm = foodStatValues[4]
-    TIE = getPropertyValueByName(statusComponent['properties'], 'TamedIneffectivenessModifier') 
+    TIE = statusComponent.tamedIneffectiveness
     if not TIE:
         TIE = 0.0
     TE = 1 / (1 + TIE)
 
-    IB = getPropertyValueByName(statusComponent['properties'], 'DinoImprintingQuality') 
+    IB = statusComponent.imprintingQuality
     if not IB:
         IB = 0.0
 
-    TBHM = valuesjson_entry['TamedBaseHealthMultiplier'] # we actually don't care.
-    IwM = 1.0 ## Server config
+    TBHM = valuesjson_entry['TamedBaseHealthMultiplier'] # we actually don't care; it's for health only.
+    multipliers = multipliers or DEFAULT_SERVER_MULTIPLIERS
+    IwM = multipliers['IwM'] # PerLevelStatsMultiplier_DinoWild from Game.ini
 
 ### DEBUG ###
-    name = getPropertyValueByName(dino['properties'], 'TamedName')
+    name = dino.tamedName
     #print("{} - B {}  Lw {}  Ld {}  Iw {}  Id {}  Ta {}  Tm {}  TE {}  IB {}".format(name, B, Lw, Ld, Iw, Id, Ta, Tm, TE, IB))
 ### DEBUG ###
 
-    TmM = 1.0 # PerLevelStatsMultiplier_DinoTamed_Affinity from Game.ini
-    IdM = 1.0 # PerLevelStatsMultiplier_DinoTamed from Game.ini
-    TaM = 1.0 # PerLevelStatsMultiplier_DinoTamed_Add from Game.ini
-    IBM = 1.0 ## Server config
+    TmM = multipliers['TmM'] # PerLevelStatsMultiplier_DinoTamed_Affinity from Game.ini
+    IdM = multipliers['IdM'] # PerLevelStatsMultiplier_DinoTamed from Game.ini
+    TaM = multipliers['TaM'] # PerLevelStatsMultiplier_DinoTamed_Add from Game.ini
+    IBM = multipliers['IBM'] # BabyImprintingStatScaleMultiplier from GameUserSettings.ini
 
     return calculate_stat_value(Lw=Lw, Iw=Iw, IwM=IwM, IB=IB, Ta=Ta, TaM=TaM, TE=TE, Tm=Tm, TmM=TmM, Ld=Ld, Id=Id, IdM=IdM, B=B, IBM=IBM, TBHM=1.0)
 
@@ -340,69 +1547,181 @@ def calculate_stat_value(*, Lw, Iw, IwM, IB, Ta, TaM, TE, Tm, TmM, Ld, Id, IdM,
     return V
 
 
-def report_hungry_tames(hungry_tames_filename):
-    values_by_bp = load_values_json()
+def parse_server_multipliers(text):
+    """
+    Turns "IdM=0.5,TaM=0.14" (from --server-multipliers) into a full
+    multipliers dict, starting from DEFAULT_SERVER_MULTIPLIERS.
+    """
+    multipliers = dict(DEFAULT_SERVER_MULTIPLIERS)
+    for setting in (text or "").split(","):
+        if not setting.strip():
+            continue
+        (name, equals, value) = setting.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_SERVER_MULTIPLIERS or not equals:
+            raise ValueError("Unknown server multiplier setting '{}'; expected one of {} as Name=number".format(
+                setting.strip(), ", ".join(DEFAULT_SERVER_MULTIPLIERS)))
+        multipliers[name] = float(value)
+    return multipliers
+
+
+def parse_report_names(text):
+    """ Turns "fuel,hungry" (from --reports) into report names, or None for all of them. """
+    if text is None:
+        return None
+    reports = [name.strip() for name in text.split(",") if name.strip()]
+    unknown = [name for name in reports if name not in REPORTS]
+    if unknown or not reports:
+        raise ValueError("Unknown report '{}'; choose from {}".format(",".join(unknown), ", ".join(report_names())))
+    return reports
+
+
+def species_stat_table(values_by_bp):
+    """
+    values.json's fullStatsRaw for every species as numpy columns, for
+    calculate_tame_stats.  Returns (row by class name, B, Iw, Id, Ta, Tm,
+    TBHM), each stat column shaped species x 12.  Stats a species doesn't
+    have (null in values.json) come out as all zeros.
+    """
+    rows = dict()
+    raw = numpy.zeros((len(values_by_bp), NUM_STATS, 5))
+    TBHM = numpy.ones((len(values_by_bp), NUM_STATS))
+    for (row, (className, species)) in enumerate(values_by_bp.items()):
+        rows[className] = row
+        for (stat, statValues) in enumerate(species['fullStatsRaw'][:NUM_STATS]):
+            if statValues:
+                raw[row, stat, :len(statValues[:5])] = statValues[:5]
+        TBHM[row, 0] = species.get('TamedBaseHealthMultiplier', 1.0)  # it only ever applies to health
+    return (rows, raw[:, :, 0], raw[:, :, 1], raw[:, :, 2], raw[:, :, 3], raw[:, :, 4], TBHM)
+
+
+class TameStats:
+    """
+    All 12 stat totals (and current values) for a batch of tames, from
+    calculate_tame_stats.  Look one up with total(dinoId, stat).
+    """
+    def __init__(self, rows, totals, current):
+        self.rows = rows
+        self.totals = totals
+        self.current = current
 
-    with open(hungry_tames_filename, "w") as outfile:
-        # We're denormalizing here; producing a flat list out of hierarchical objects.
-        header = "ID\tDino\tLevel\tDino Name\tx\ty\tz\tFood Levelups Wild\tFood Levelups Tame\tFood Current\tFood Total\tFoodPercent\tTamerString\tPlayerName\tTribeName\n"
-        outfile.write(header)
+    def __contains__(self, dinoId):
+        return dinoId in self.rows
 
-        for dino_id in tame_dinos:
-            dino = tame_dinos[dino_id]
-            if dino['class'] in not_really_dinos:
-                continue  # skip rafts and stuff
-            isInCryopod = False
-            for name in dino['names']:
-                if "PrimalItem_WeaponEmptyCryopod" in name:
-                    isInCryopod = True
-            if isInCryopod:
-                continue # skip cryopods
-
-            status = dino_status[getPropertyValueByName(dino['properties'], 'MyCharacterStatusComponent')]
-
-            food_current_value = getPropertyValueByNameAndIndex(status['properties'], "CurrentStatusValues", INDEX_FOOD)
-            if not food_current_value:
-                food_current_value = 0.0
-            food_levelups_wild = getPropertyValueByNameAndIndex(status['properties'], "NumberOfLevelUpPointsApplied", INDEX_FOOD)
-            if not food_levelups_wild:
-                food_levelups_wild = 0.0
-            food_levelups_tame = getPropertyValueByNameAndIndex(status['properties'], "NumberOfLevelUpPointsAppliedTamed", INDEX_FOOD)
-            if not food_levelups_tame:
-                food_levelups_tame = 0.0
-
-            base_character_level = getPropertyValueByName(status['properties'], "BaseCharacterLevel")
-            if not base_character_level:
-                base_character_level = 0.0
-            extra_character_level = getPropertyValueByName(status['properties'], "ExtraCharacterLevel")
-            if not extra_character_level:
-                extra_character_level = 0.0
-
-            food_total = calculate_food_total(dino, values_by_bp.get(dino['class'], None), base_character_level, extra_character_level, food_levelups_wild, food_levelups_tame)
-            if (food_total < 1):
-                food_percent = 0
-                print("Warning - could not calculate food total for class {}".format(dino['class']))
-            else:
-                food_percent = food_current_value / food_total
-
-
-            row = str(dino['id']) + \
-                "\t" + str(simplifyName(dino['class'])) + \
-                "\t" + str(base_character_level + extra_character_level) + \
-                "\t" + str(getPropertyValueByName(dino['properties'], 'TamedName')) + \
-                "\t" + str(dino['location']['x']) + \
-                "\t" + str(dino['location']['y']) + \
-                "\t" + str(dino['location']['z']) + \
-                "\t" + str(food_levelups_wild) + \
-                "\t" + str(food_levelups_tame) + \
-                "\t" + str(food_current_value) + \
-                "\t" + str(food_total) + \
-                "\t" + str(food_percent) + \
-                "\t" + str(getPropertyValueByName(dino['properties'], 'TamerString')) + \
-                "\t" + str(getPropertyValueByName(dino['properties'], 'OwningPlayerName')) + \
-                "\t" + str(getPropertyValueByName(dino['properties'], 'TribeName'))
-            if (food_percent < 0.50):
-                outfile.write(row + "\n")
+    def total(self, dinoId, stat):
+        return float(self.totals[self.rows[dinoId], stat])
+
+
+def calculate_tame_stats(state, dinos, values_by_bp, multipliers=None):
+    """
+    The calculate_stat_value formula for every stat of every tame at once.
+    Level-ups, TE and IB come out of the status records into columns, get
+    joined to the species columns from species_stat_table, and the whole
+    thing is worked out in one go with numpy instead of one tame and one
+    stat at a time.  Same operations in the same order, so the numbers
+    match the one-at-a-time path exactly.
+
+    Tames whose species isn't in values_by_bp, or that have no status
+    component, are left out; calculate_food_total explains what's wrong
+    with those.  Needs numpy.
+    """
+    multipliers = multipliers or DEFAULT_SERVER_MULTIPLIERS
+    batch = [dino for dino in dinos if dino.className in values_by_bp and dino.statusId and dino.statusId in state.dino_status]
+    (species_rows, B, Iw, Id, Ta, Tm, TBHM) = species_stat_table(values_by_bp)
+    rows = dict((dino.id, row) for (row, dino) in enumerate(batch))
+    species = numpy.fromiter((species_rows[dino.className] for dino in batch), dtype=numpy.intp, count=len(batch))
+    statuses = [state.dino_status[dino.statusId] for dino in batch]
+    Lw = numpy.array([status.levelUpsWild for status in statuses], dtype=numpy.float64).reshape(len(batch), NUM_STATS)
+    Ld = numpy.array([status.levelUpsTamed for status in statuses], dtype=numpy.float64).reshape(len(batch), NUM_STATS)
+    current = numpy.array([status.currentStatusValues for status in statuses], dtype=numpy.float64).reshape(len(batch), NUM_STATS)
+    TIE = numpy.array([status.tamedIneffectiveness or 0.0 for status in statuses], dtype=numpy.float64)
+    IB = numpy.array([status.imprintingQuality or 0.0 for status in statuses], dtype=numpy.float64)
+    TE = 1 / (1 + TIE)
+
+    a = (1.0 + (Lw * Iw[species] * multipliers['IwM']))
+    b = (1.0 + (IB * 0.2 * multipliers['IBM']))[:, None]
+    c = (1.0 + (TE[:, None] * Tm[species] * multipliers['TmM']))
+    d = (1.0 + (Ld * Id[species] * multipliers['IdM']))
+    totals = ((B[species] * a * TBHM[species] * b) + (Ta[species] * multipliers['TaM'])) * c * d
+    return TameStats(rows, totals, current)
+
+
+def iter_tame_food(state, values_by_bp, multipliers=None):
+    """
+    Works out the food numbers for every real tame (no rafts, nothing in a
+    cryopod).  Yields (dino, food) where food holds what the hungry tames
+    report prints: current, total and percent, the food level-ups, and
+    the dino's level.
+
+    With numpy installed the totals are worked out for all tames at once by
+    calculate_tame_stats; otherwise one at a time by calculate_food_total.
+    """
+    stats = None
+    if numpy is not None:
+        real_tames = [dino for dino in state.tame_dinos.values() if dino.className not in not_really_dinos and not dino.inCryopod]
+        stats = calculate_tame_stats(state, real_tames, values_by_bp, multipliers)
+
+    for dino_id in state.tame_dinos:
+        dino = state.tame_dinos[dino_id]
+        if dino.className in not_really_dinos:
+            continue  # skip rafts and stuff
+        if dino.inCryopod:
+            continue # skip cryopods
+
+        status = state.dino_status[dino.statusId]
+
+        food_current_value = status.currentStatusValues[INDEX_FOOD]
+        if not food_current_value:
+            food_current_value = 0.0
+        food_levelups_wild = status.levelUpsWild[INDEX_FOOD]
+        if not food_levelups_wild:
+            food_levelups_wild = 0.0
+        food_levelups_tame = status.levelUpsTamed[INDEX_FOOD]
+        if not food_levelups_tame:
+            food_levelups_tame = 0.0
+
+        base_character_level = status.baseCharacterLevel
+        if not base_character_level:
+            base_character_level = 0.0
+        extra_character_level = status.extraCharacterLevel
+        if not extra_character_level:
+            extra_character_level = 0.0
+
+        if stats is not None and dino.id in stats:
+            food_total = stats.total(dino.id, INDEX_FOOD)
+        else:
+            food_total = calculate_food_total(state, dino, values_by_bp.get(dino.className, None), base_character_level, extra_character_level, food_levelups_wild, food_levelups_tame, multipliers)
+        if (food_total < 1):
+            food_percent = 0
+            print("Warning - could not calculate food total for class {}".format(dino.className))
+        else:
+            food_percent = food_current_value / food_total
+
+        yield (dino, {
+            'level': base_character_level + extra_character_level,
+            'levelupsWild': food_levelups_wild,
+            'levelupsTame': food_levelups_tame,
+            'current': food_current_value,
+            'total': food_total,
+            'percent': food_percent,
+        })
+
+
+def report_hungry_tames(state, hungry_tames_filename, multipliers=None, values_by_bp=None):
+    if values_by_bp is None:
+        values_by_bp = load_values_json()
+
+    # We're denormalizing here; producing a flat list out of hierarchical objects.
+    header = ["ID", "Dino", "Level", "Dino Name", "x", "y", "z", "Food Levelups Wild", "Food Levelups Tame",
+              "Food Current", "Food Total", "FoodPercent", "TamerString", "PlayerName", "TribeName"]
+    with ReportWriter(hungry_tames_filename, header) as writer:
+        for (dino, food) in iter_tame_food(state, values_by_bp, multipliers):
+            if (food['percent'] < HUNGRY_FOOD_PERCENT):
+                writer.row(*map(str, (dino.id, simplifyName(dino.className), food['level'], dino.tamedName,
+                                      dino.x, dino.y, dino.z, food['levelupsWild'], food['levelupsTame'],
+                                      food['current'], food['total'], food['percent'],
+                                      dino.tamerString, dino.owningPlayerName, dino.tribeName)))
+    return hungry_tames_filename
 
 
 def simplify_json_to_game_objects(json_full_filename, json_objects_filename):
@@ -427,6 +1746,10 @@ def simplify_json_to_game_objects(json_full_filename, json_objects_filename):
 
     The result is [ { "id": 1 ...}, { "id": 2 ...} ] with just the array of
     game objects and not all the other stuff.
+
+    The main pipeline no longer needs this (stream_game_objects reads the
+    full json directly); it's kept for when you want the smaller file.
+    Either file can be compressed (.gz or .zst); it's all done streaming.
     """
     start_line = "  \"objects\": ["
     end_line   = "  \"hibernation\": {"
@@ -434,8 +1757,8 @@ def simplify_json_to_game_objects(json_full_filename, json_objects_filename):
     previous_line = ""
     current_line = ""
     writing = False
-    with open(json_objects_filename, 'w+') as outfile:
-        with open(json_full_filename, 'r') as infile:
+    with open_text_output(json_objects_filename) as outfile:
+        with open_text_input(json_full_filename) as infile:
             for current_line in infile:
                 if writing and not end_line.strip() == current_line.strip():
                     outfile.write(previous_line)
@@ -450,23 +1773,1116 @@ def simplify_json_to_game_objects(json_full_filename, json_objects_filename):
                 previous_line = current_line
 
 
-def process_game_objects(json_objects_filename, totalObjectsCount):
+def stream_game_objects(data):
+    """
+    Yields game objects one at a time straight out of the converter's json.
+    We walk the token stream until we find the top-level "objects" key and
+    then hand the rest of the stream to naya to read the array lazily, so
+    the multi-GB file is read once and never rewritten.  Nothing here
+    depends on whitespace or line breaks.  Reading stops at the end of the
+    objects array; the hibernation data after it is never touched.
+
+    For backwards compatibility this also accepts a bare array, which is
+    what simplify_json_to_game_objects writes out.
+    """
+    tokens = naya.tokenize(data)
+    first = next(tokens, None)
+    if first == (TOKEN_TYPE.OPERATOR, "["):
+        yield from naya.stream_array(itertools.chain([first], tokens))
+        return
+
+    depth = 0
+    previous = None
+    for (token_type, token) in itertools.chain([first] if first else [], tokens):
+        if token_type == TOKEN_TYPE.OPERATOR:
+            if token == "{" or token == "[":
+                depth += 1
+            elif token == "}" or token == "]":
+                depth -= 1
+            elif token == ":" and depth == 1 and previous == (TOKEN_TYPE.STRING, "objects"):
+                yield from naya.stream_array(tokens)
+                return
+        previous = (token_type, token)
+    raise ValueError("Couldn't find the top-level \"objects\" array in the json.")
+
+
+# Parser backends.  Each turns the converter's json into game object dicts,
+# and they all give exactly the same dicts (CheckParserBackends.py checks).
+#   slices  cuts the objects array at object boundaries without parsing
+#           (see iter_object_slices) and decodes each object with the json
+#           module's C decoder.  Fastest, but needs the finished, pretty-
+#           printed file, so not for --pipeline or minified json.
+#   ijson   an incremental parser, only used with its C (yajl2_c) backend.
+#           Reads any stream.  pip install ijson
+#   naya    pure python, always there, and the slowest.
+
+def slice_game_objects(json_filename, start=None, end=None, plan=None, parser='slices', offsets=None):
+    """
+    With a ReportPlan, objects it rules out from their raw json come out
+    as None, unparsed.  parser picks the decoder; see decode_game_object.
+    Where every object was (skipped ones too) goes into offsets, an
+    ObjectOffsets, if one is passed in.
+    """
+    for (offset, raw) in iter_object_slices(json_filename, start, end):
+        if offsets is not None:
+            offsets.add(offset, raw)
+        if plan is not None and not plan.may_want_raw(raw):
+            yield None
+        else:
+            yield decode_game_object(raw, parser)
+
+def ijson_game_objects(data):
+    """ data is a binary stream of the converter's json or of a bare array. """
+    data = data if hasattr(data, 'peek') else io.BufferedReader(data)
+    prefix = 'item' if data.peek(64).lstrip().startswith(b'[') else 'objects.item'
+    return ijson.items(data, prefix, use_float=True)
+
+def naya_game_objects(data):
+    """ data is a binary stream; see stream_game_objects. """
+    return stream_game_objects(io.TextIOWrapper(data, encoding='utf-8'))
+
+def decode_game_object(raw, parser):
+    """ One game object's raw json (from iter_object_slices) with the given parser's decoder. """
+    if parser == 'naya':
+        return naya.parse_string(raw.decode('utf-8'))
+    return json.loads(raw)
+
+PARSER_BACKENDS = ('slices', 'ijson', 'naya')
+
+def available_parsers():
+    return [parser for parser in PARSER_BACKENDS if parser != 'ijson' or ijson is not None]
+
+def choose_parser(parser='auto', json_filename=None):
+    """
+    Picks the parser backend to read json_filename with, or a stream if
+    json_filename is None.  'auto' means the fastest one that works here;
+    a named one is used if it can be, and otherwise the next best.
+    """
+    if parser not in PARSER_BACKENDS and parser != 'auto':
+        raise ValueError("Unknown parser {}; choose from auto, {}".format(parser, ", ".join(PARSER_BACKENDS)))
+    if parser == 'ijson' and ijson is None:
+        print("    ijson (with its C backend) isn't installed; using the next best parser.", flush=True)
+        parser = 'auto'
+    if parser in ('slices', 'auto'):
+        if json_filename is not None and find_objects_array(json_filename):
+            return 'slices'
+        if parser == 'slices':
+            print("    Can't cut {} into objects; using the next best parser.".format(json_filename or "a stream"), flush=True)
+    if parser in ('slices', 'auto'):
+        return 'ijson' if ijson is not None else 'naya'
+    return parser
+
+
+class ProgressPrinter:
+    """
+    Prints how far along a long loop is, at most every
+    PROGRESS_INTERVAL_SECONDS, so the printing itself costs next to nothing.
+    Works with or without a total; without one it just counts.
+    """
+    def __init__(self, total=None, interval=PROGRESS_INTERVAL_SECONDS):
+        self.total = total
+        self.interval = interval
+        self.next_print = time.perf_counter() + interval
+
+    def update(self, count):
+        now = time.perf_counter()
+        if now >= self.next_print:
+            self.next_print = now + self.interval
+            self.show(count)
+
+    def show(self, count):
+        if self.total:
+            print('{:2.2f}%   '.format(count * 100.0 / self.total), end="\r", flush=True)
+        else:
+            print('{} objects   '.format(count), end="\r", flush=True)
+
+    def done(self, count):
+        self.show(count)
+        print("")
+
+
+def peak_rss_bytes(who=None):
+    """
+    Peak resident memory so far of this process (or of its finished child
+    processes, with who=resource.RUSAGE_CHILDREN), or None where the
+    resource module doesn't exist.
+    """
+    if resource is None:
+        return None
+    if who is None:
+        who = resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux reports kilobytes
+
+def cpu_seconds():
+    """ User plus system time, counting finished child processes (the converter, workers). """
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+def file_size(filename):
+    try:
+        return os.path.getsize(filename)
+    except OSError:
+        return 0
+
+
+def available_codecs():
+    return [codec for codec in COMPRESSION_EXTENSIONS if codec != 'zstd' or zstandard is not None]
+
+def choose_codec(codec):
+    """
+    The codec to compress with for --compress, or None for none.  zstd
+    needs the zstandard package; without it, gzip is used instead.
+    """
+    if codec in (None, 'none'):
+        return None
+    if codec not in COMPRESSION_EXTENSIONS:
+        raise ValueError("Unknown codec {}; choose from none, {}".format(codec, ", ".join(COMPRESSION_EXTENSIONS)))
+    if codec == 'zstd' and zstandard is None:
+        print("    zstandard isn't installed; compressing with gzip instead.", flush=True)
+        return 'gzip'
+    return codec
+
+def compressed_filename(filename, codec):
+    return filename + COMPRESSION_EXTENSIONS[codec] if codec else filename
+
+def filename_codec(filename):
+    """ The codec a file is compressed with, going by its extension, or None. """
+    for (codec, extension) in COMPRESSION_EXTENSIONS.items():
+        if filename.endswith(extension):
+            return codec
+    return None
+
+def remove_old_copies(filename, keep=None):
+    """
+    Deletes filename and its compressed copies (filename.gz, .zst) except
+    keep, so what an earlier run with another --compress left behind can't
+    be mistaken for this run's.  Returns the ones deleted.
+    """
+    removed = []
+    for candidate in [filename] + [compressed_filename(filename, codec) for codec in COMPRESSION_EXTENSIONS]:
+        if candidate != keep and os.path.isfile(candidate):
+            os.remove(candidate)
+            removed.append(candidate)
+    return removed
+
+
+class CodecStats:
+    """
+    Running totals of what the codecs have done in this process, per codec
+    and direction: bytes of text, bytes on disk, and the CPU seconds spent
+    in the codec itself.  That's thread CPU time, so reports compressing at
+    the same time don't get charged for each other.  RunMetrics takes
+    snapshots of CODEC_STATS to show each stage's share and the whole run's.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = dict()  # (codec, 'compress' or 'decompress') -> [text bytes, disk bytes, cpu seconds]
+
+    def add(self, codec, direction, text_bytes, disk_bytes, cpu):
+        with self.lock:
+            totals = self.totals.setdefault((codec, direction), [0, 0, 0.0])
+            totals[0] += text_bytes
+            totals[1] += disk_bytes
+            totals[2] += cpu
+
+    def snapshot(self):
+        with self.lock:
+            return dict((key, list(totals)) for (key, totals) in self.totals.items())
+
+    @staticmethod
+    def summary(after, before=None):
+        """
+        What happened between two snapshots, as the metrics file lists it:
+        how much smaller the files were, and what that cost in CPU.
+        """
+        rows = []
+        for ((codec, direction), totals) in sorted(after.items()):
+            earlier = (before or {}).get((codec, direction), [0, 0, 0.0])
+            (text_bytes, disk_bytes, cpu) = (now - then for (now, then) in zip(totals, earlier))
+            if not text_bytes and not disk_bytes:
+                continue
+            saved = text_bytes - disk_bytes
+            rows.append({
+                'codec': codec,
+                'direction': direction,
+                'text_bytes': text_bytes,
+                'disk_bytes': disk_bytes,
+                'ratio': round(text_bytes / disk_bytes, 2) if disk_bytes else None,
+                'bytes_saved': saved,
+                'cpu_seconds': round(cpu, 3),
+                'mb_saved_per_cpu_second': round(saved / 1024.0 / 1024.0 / cpu, 1) if cpu > 0 else None,
+            })
+        return rows
+
+CODEC_STATS = CodecStats()
+
+
+class CompressingFile(io.RawIOBase):
+    """
+    A file that compresses everything written to it, as one gzip member or
+    zstd frame (or several; see new_frame), without ever holding more than
+    a chunk.  Usually wrapped up by open_text_output.
+    """
+    def __init__(self, filename, codec):
+        self.codec = codec
+        self.compressor = self.new_compressor()
+        self.file = open(filename, 'wb')
+        (self.text_bytes, self.disk_bytes, self.cpu) = (0, 0, 0.0)
+
+    def new_compressor(self):
+        if self.codec == 'gzip':
+            return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: with a gzip header
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def finish_frame(self):
+        started = time.thread_time()
+        compressed = self.compressor.flush()
+        self.cpu += time.thread_time() - started
+        self.disk_bytes += len(compressed)
+        self.file.write(compressed)
+
+    def new_frame(self):
+        """
+        Ends the gzip member or zstd frame being written and starts another,
+        which can be decompressed without anything before it.  The file
+        still reads as one (see DecompressingFile).  Returns where the new
+        one starts in the file.
+        """
+        self.finish_frame()
+        self.compressor = self.new_compressor()
+        return self.disk_bytes
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        started = time.thread_time()
+        compressed = self.compressor.compress(data)
+        self.cpu += time.thread_time() - started
+        self.text_bytes += len(data)
+        self.disk_bytes += len(compressed)
+        self.file.write(compressed)
+        return len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self.finish_frame()
+            CODEC_STATS.add(self.codec, 'compress', self.text_bytes, self.disk_bytes, self.cpu)
+        finally:
+            self.file.close()
+            super().close()
+
+
+class DecompressingFile(io.RawIOBase):
+    """
+    Reads a gzip or zstd file as the text it holds, a chunk at a time.
+    Files made of several gzip members or zstd frames (as from cat a.gz
+    b.gz) read as one.  Usually wrapped up by open_binary_input.
+    """
+    def __init__(self, filename, codec):
+        self.codec = codec
+        self.file = open(filename, 'rb')
+        self.decompressor = self.new_decompressor()
+        self.pending = b''
+        self.offset = 0
+        (self.text_bytes, self.disk_bytes, self.cpu) = (0, 0, 0.0)
+
+    def new_decompressor(self):
+        if self.codec == 'gzip':
+            return zlib.decompressobj(31)
+        return zstandard.ZstdDecompressor().decompressobj()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self.offset >= len(self.pending):
+            chunk = self.file.read(CODEC_CHUNK_BYTES)
+            if not chunk:
+                return 0
+            self.disk_bytes += len(chunk)
+            started = time.thread_time()
+            self.pending = self.decompressor.decompress(chunk)
+            while self.decompressor.eof and self.decompressor.unused_data:
+                rest = self.decompressor.unused_data
+                self.decompressor = self.new_decompressor()
+                self.pending += self.decompressor.decompress(rest)
+            self.cpu += time.thread_time() - started
+            self.offset = 0
+        count = min(len(buffer), len(self.pending) - self.offset)
+        buffer[:count] = self.pending[self.offset:self.offset + count]
+        self.offset += count
+        self.text_bytes += count
+        return count
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            CODEC_STATS.add(self.codec, 'decompress', self.text_bytes, self.disk_bytes, self.cpu)
+        finally:
+            self.file.close()
+            super().close()
+
+
+def open_binary_input(filename):
+    """ Opens a file for reading as bytes, decompressing it on the way if its extension says it's compressed. """
+    codec = filename_codec(filename)
+    if codec is None:
+        return open(filename, 'rb')
+    return io.BufferedReader(DecompressingFile(filename, codec), CODEC_CHUNK_BYTES)
+
+def open_text_input(filename):
+    """ open(filename) for text files that may be compressed; see open_binary_input. """
+    if filename_codec(filename) is None:
+        return open(filename)
+    return io.TextIOWrapper(open_binary_input(filename))
+
+def open_text_output(filename):
+    """
+    open(filename, "w") that compresses as it writes when the filename
+    ends in .gz or .zst (see COMPRESSION_EXTENSIONS).
+    """
+    codec = filename_codec(filename)
+    if codec is None:
+        return open(filename, "w")
+    return io.TextIOWrapper(io.BufferedWriter(CompressingFile(filename, codec), CODEC_CHUNK_BYTES))
+
+def compress_file(filename, codec, frames=None):
+    """
+    Compresses a file next to itself, streaming, and deletes the original.
+    Returns the new filename.
+
+    With frames, a list, a new gzip member or zstd frame is started after
+    every JSON_FRAME_BYTES of the original, and (offset in the original,
+    offset in the compressed file) for the start of each one is added to
+    the list, so it can be read from the middle; see ObjectIndex.
+    """
+    target_filename = compressed_filename(filename, codec)
+    with open(filename, 'rb') as infile:
+        with CompressingFile(target_filename, codec) as outfile:
+            if frames is not None:
+                frames.append((0, 0))
+            while True:
+                wanted = CODEC_CHUNK_BYTES
+                if frames is not None:
+                    wanted = min(wanted, frames[-1][0] + JSON_FRAME_BYTES - outfile.text_bytes)
+                chunk = infile.read(wanted)
+                if not chunk:
+                    break
+                outfile.write(chunk)
+                if frames is not None and outfile.text_bytes == frames[-1][0] + JSON_FRAME_BYTES:
+                    frames.append((outfile.text_bytes, outfile.new_frame()))
+    os.remove(filename)
+    return target_filename
+
+
+class StageMetrics:
+    """
+    One timed stage of a run; see RunMetrics.stage.  Set objects to however
+    many things the stage went through so objects/sec can be worked out.
+    A threaded stage only counts its own thread's CPU time, since other
+    stages are using the process at the same time.
+    """
+    def __init__(self, name, reads, writes, threaded=False):
+        self.name = name
+        self.reads = list(reads)
+        self.writes = list(writes)
+        self.objects = None
+        self.cpu_clock = time.thread_time if threaded else cpu_seconds
+
+    def start(self):
+        self.wall_start = time.perf_counter()
+        self.cpu_start = self.cpu_clock()
+        self.codecs_start = CODEC_STATS.snapshot()
+
+    def finish(self):
+        self.wall_seconds = time.perf_counter() - self.wall_start
+        self.cpu_seconds = self.cpu_clock() - self.cpu_start
+        self.codecs = CodecStats.summary(CODEC_STATS.snapshot(), self.codecs_start)
+        self.bytes_read = sum(file_size(filename) for filename in self.reads)
+        self.bytes_written = sum(file_size(filename) for filename in self.writes)  # before the json can get compressed or deleted
+        self.peak_rss_bytes = peak_rss_bytes()
+        self.peak_children_rss_bytes = peak_rss_bytes(resource.RUSAGE_CHILDREN) if resource else None
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'wall_seconds': round(self.wall_seconds, 3),
+            'cpu_seconds': round(self.cpu_seconds, 3),
+            'objects': self.objects,
+            'objects_per_second': round(self.objects / self.wall_seconds, 1) if self.objects and self.wall_seconds > 0 else None,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'peak_rss_bytes': self.peak_rss_bytes,
+            'peak_children_rss_bytes': self.peak_children_rss_bytes,
+            'codecs': self.codecs,
+        }
+
+
+class RunMetrics:
+    """
+    Collects wall time, CPU time, objects/sec, bytes read and written and
+    peak memory for each stage of main_conversion, and writes them out as
+    MyMap_metrics.json so runs can be compared with each other.
+
+        metrics = RunMetrics(ark_binary_filename, state)
+        with metrics.stage("inventory", reads=[], writes=[inventory_filename]) as stage:
+            ...
+            stage.objects = len(state.itemstacks)
+        metrics.write(metrics_filename)
+
+    Bytes read and written are the sizes of the files a stage names as its
+    input and output, measured when it finishes.  Peak memory is the high
+    water mark so far, so it only ever goes up from stage to stage.  The
+    per-category object counts come from state, a GameState, if given.
+
+    With compressed files (--compress), codecs says how much smaller they
+    came out and how much CPU that took, for the run and for each stage;
+    see CodecStats.  Stages that run at the same time (the reports) are
+    timed with threaded=True, so each one's CPU time is only its own
+    thread's; they do each see the others' compression, though.
+    """
+    def __init__(self, ark_binary_filename, state=None):
+        self.ark_binary_filename = ark_binary_filename
+        self.state = state
+        self.started = time.time()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = cpu_seconds()
+        self.codecs_start = CODEC_STATS.snapshot()
+        self.stages = []
+        self.notes = dict()
+
+    @contextlib.contextmanager
+    def stage(self, name, reads=(), writes=(), threaded=False):
+        stage = StageMetrics(name, reads, writes, threaded)
+        stage.start()
+        try:
+            yield stage
+        finally:
+            stage.finish()
+            self.stages.append(stage)
+
+    def as_dict(self):
+        return {
+            'save': self.ark_binary_filename,
+            'started': time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            'python': sys.version.split()[0],
+            'classifier_version': CLASSIFIER_VERSION,
+            'wall_seconds': round(time.perf_counter() - self.wall_start, 3),
+            'cpu_seconds': round(cpu_seconds() - self.cpu_start, 3),
+            'peak_rss_bytes': peak_rss_bytes(),
+            'peak_children_rss_bytes': peak_rss_bytes(resource.RUSAGE_CHILDREN) if resource else None,
+            'notes': self.notes,
+            'codecs': CodecStats.summary(CODEC_STATS.snapshot(), self.codecs_start),
+            'stages': [stage.as_dict() for stage in self.stages],
+            'object_types': dict(sorted(self.state.object_type_counts.items())) if self.state else {},
+        }
+
+    def write(self, metrics_filename):
+        with open(metrics_filename, "w") as outfile:
+            json.dump(self.as_dict(), outfile, indent=2)
+            outfile.write("\n")
+
+
+def process_game_objects(state, json_filename, totalObjectsCount, parser='auto', offsets=None):
     """
     Reads the game objects json and pulls out text-format inventory etc.
-    Stores this information in global variables for later reporting.
+    Stores this information in state, a GameState, for later reporting.
+    Each object gets its property lookups built once here (see
+    index_properties) so the reports don't rescan property lists.
+
+    The json can be either the full converter output or a simplified
+    _game_objects.json; see stream_game_objects.  parser picks the parser
+    backend; see choose_parser.  A compressed json (.gz or .zst) is
+    decompressed as it's read, which needs a streaming parser; see
+    open_binary_input.  Returns how many game objects were read.
+
+    When the objects are cut out of the json by layout, where each one was
+    goes into offsets, an ObjectOffsets, if one is passed in; the streaming
+    parsers can't say, so it stays empty with those.
+    """
+    if parser != 'slices' or filename_codec(json_filename):
+        parser = choose_parser(parser, json_filename)
+    if parser == 'slices':
+        return process_parsed_game_objects(state, slice_game_objects(json_filename, plan=state.plan, offsets=offsets), totalObjectsCount)
+    if parser == 'naya' and state.plan is not None and find_objects_array(json_filename):
+        # naya is slow at everything it reads, so cut the objects out first and only hand it the wanted ones
+        return process_parsed_game_objects(state, slice_game_objects(json_filename, plan=state.plan, parser=parser, offsets=offsets), totalObjectsCount)
+    with open_binary_input(json_filename) as data:
+        return process_game_object_stream(state, data, totalObjectsCount, parser)
+
+def process_game_object_stream(state, data, totalObjectsCount=None, parser='auto'):
+    """
+    process_game_objects for json that's already open; data can be any
+    binary stream, such as a FollowingFile.  Without a total, progress is
+    shown as a plain count.
+    """
+    parser = choose_parser(parser)
+    gameobjects = ijson_game_objects(data) if parser == 'ijson' else naya_game_objects(data)
+    return process_parsed_game_objects(state, gameobjects, totalObjectsCount)
+
+def process_parsed_game_objects(state, gameobjects, totalObjectsCount=None):
+    count = 0
+    progress = ProgressPrinter(totalObjectsCount)
+    for gameobject in gameobjects:
+        handle_object(state, gameobject)
+        count = count + 1
+        progress.update(count)
+    progress.done(count)
+    return count
+
+
+def find_objects_array(json_filename):
+    """
+    Finds the byte range of the top-level objects array in the converter's
+    json, and the indentation its game objects are written at, without
+    parsing anything.  The converter pretty-prints, and a json string can't
+    hold a raw line break, so a line that is exactly the object indentation
+    followed by "}" always closes one game object.  That's what lets us cut
+    the array into pieces for separate processes.
+
+    Returns (array_start, array_end, object_indent), or None if the file
+    isn't laid out that way (minified, say), in which case the caller should
+    stick to the serial reader.
+    """
+    with open(json_filename, 'rb') as data:
+        first_line = data.readline(64)
+        if first_line.strip() != b'{':
+            return None
+        offset = len(first_line)
+        key_indent = None
+        while True:
+            line = data.readline(1024 * 1024)
+            if not line:
+                return None
+            offset += len(line)
+            stripped = line.lstrip()
+            indent = line[:len(line) - len(stripped)]
+            if key_indent is None:
+                key_indent = indent
+            if indent == key_indent and stripped.startswith(b'"objects"'):
+                break
+        if not stripped.rstrip().endswith(b'['):
+            return None  # empty or inline array; nothing worth splitting
+        array_start = offset
+        first_object = data.readline(1024)
+        object_indent = first_object[:len(first_object) - len(first_object.lstrip())]
+        if first_object.strip() != b'{':
+            return None
+
+    with open(json_filename, 'rb') as data:
+        with mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            array_end = mapped.find(b"\n" + key_indent + b"]", array_start)
+    if array_end < 0:
+        return None
+    return (array_start, array_end, object_indent)
+
+
+def split_objects_array(json_filename, pieces):
+    """
+    Cuts the objects array into roughly equal byte ranges that each hold
+    whole game objects.  Returns a list of (start, end) offsets, or None if
+    the json layout doesn't allow it; see find_objects_array.
+    """
+    layout = find_objects_array(json_filename)
+    if not layout:
+        return None
+    (array_start, array_end, object_indent) = layout
+    object_end = b"\n" + object_indent + b"}"
+
+    boundaries = [array_start]
+    with open(json_filename, 'rb') as data:
+        with mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for piece in range(1, pieces):
+                target = array_start + (array_end - array_start) * piece // pieces
+                found = mapped.find(object_end, max(target, boundaries[-1]), array_end)
+                if found < 0:
+                    break
+                boundary = found + len(object_end)
+                if boundary > boundaries[-1]:
+                    boundaries.append(boundary)
+    boundaries.append(array_end)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def process_game_object_chunk(chunk):
+    """
+    Runs in a worker process: parses and classifies the game objects in one
+    byte range of the json and hands back the object count and the partial
+    maps.  Each worker starts from empty maps so nothing leaks between chunks.
+    Every parser but naya decodes the chunk object by object with the json
+    module, since the chunk boundaries are object boundaries anyway.  naya
+    goes object by object too when the chunk's plan skips some of them.
+    With with_offsets, the chunk's ObjectOffsets come back too (None when
+    naya reads the chunk whole).
+    """
+    (json_filename, start, end, parser, plan, with_offsets) = chunk
+    state = GameState()
+    state.plan = plan
+    offsets = None
+    count = 0
+    if parser == 'naya' and plan is None:
+        with open(json_filename, 'rb') as data:
+            data.seek(start)
+            text = data.read(end - start).decode('utf-8')
+        # A chunk is "{...},\n {...}" give or take a leading comma; make it an array.
+        text = text.strip().strip(',')
+        gameobjects = naya.stream_array(naya.tokenize(io.StringIO("[" + text + "]")))
+    else:
+        offsets = ObjectOffsets() if with_offsets else None
+        gameobjects = slice_game_objects(json_filename, start, end, plan, parser, offsets)
+    for gameobject in gameobjects:
+        handle_object(state, gameobject)
+        count = count + 1
+    return (count, state.game_objects(), offsets)
+
+
+def process_game_objects_parallel(state, json_filename, totalObjectsCount, workers, parser='auto', offsets=None):
+    """
+    Same result as process_game_objects, but the objects array is cut into
+    pieces at object boundaries and each piece is parsed and classified in
+    a separate process.  The partial maps (and offsets, if given) are
+    merged back in file order, so the reports come out identical to a
+    serial run.
+    """
+    chunks = split_objects_array(json_filename, workers * CHUNKS_PER_WORKER)
+    if not chunks:
+        print("    Can't split {} into pieces; reading it serially instead.".format(json_filename), flush=True)
+        return process_game_objects(state, json_filename, totalObjectsCount, parser, offsets)
+
+    parser = 'naya' if parser == 'naya' else 'slices'
+    count = 0
+    progress = ProgressPrinter(totalObjectsCount)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        work = [(json_filename, start, end, parser, state.plan, offsets is not None) for (start, end) in chunks]
+        for (chunkCount, partial, chunkOffsets) in executor.map(process_game_object_chunk, work):
+            state.merge(partial)
+            if chunkOffsets is not None:
+                offsets.extend(chunkOffsets)
+            count = count + chunkCount
+            progress.update(count)
+    progress.done(count)
+    return count
+
+
+def iter_object_slices(json_filename, start=None, end=None):
+    """
+    Yields (offset, raw json bytes) for every game object in the converter's
+    json, cut at the same object boundaries the parallel reader uses and
+    without parsing anything.  start and end limit it to one piece from
+    split_objects_array.  Raises ValueError for json that isn't laid out
+    that way; see find_objects_array.
+    """
+    layout = find_objects_array(json_filename)
+    if not layout:
+        raise ValueError("Can't find the game object boundaries in {}".format(json_filename))
+    (array_start, array_end, object_indent) = layout
+    object_end = b"\n" + object_indent + b"}"
+    (array_start, array_end) = (array_start if start is None else start, array_end if end is None else end)
+
+    with open(json_filename, 'rb') as data:
+        with mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            position = array_start
+            while True:
+                found = mapped.find(object_end, position, array_end)
+                if found < 0:
+                    break
+                end = found + len(object_end)
+                start = position
+                while mapped[start] in b", \t\r\n":
+                    start += 1  # the comma and line break left over from the previous object
+                yield (start, mapped[start:end])
+                position = end
+
+
+def object_digest(raw):
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
+
+class ObjectOffsets:
+    """
+    Where each game object is in the converter's json: its id, byte offset
+    and length, gathered while the objects are cut out of it anyway (see
+    iter_object_slices), so it costs no extra reading.  The id is picked
+    out of the raw json without parsing it.  write() saves it as
+    MyMap_objects.idx for ObjectIndex to look single objects up in later.
+
+    json_filename is the json the index is for (MyMap.json, or MyMap.json.gz
+    or .zst once it has been compressed), json_size its uncompressed size,
+    to notice when it has changed since, and frames where each gzip member
+    or zstd frame starts once it has been compressed (see compress_file).
     """
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.ids = array('q')
+        self.offsets = array('q')
+        self.lengths = array('q')
+        self.json_filename = None
+        self.json_size = 0
+        self.frames = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, offset, raw):
+        found = ID_IN_RAW_JSON.search(raw, 0, 64)
+        if found is not None:
+            self.ids.append(int(found.group(1)))
+            self.offsets.append(offset)
+            self.lengths.append(len(raw))
+
+    def extend(self, other):
+        self.ids.extend(other.ids)
+        self.offsets.extend(other.offsets)
+        self.lengths.extend(other.lengths)
+
+    def write(self, index_filename):
+        """
+        The header and the json's file name (padded to 8 bytes), then the
+        ids, offsets and lengths as three arrays of 64-bit ints sorted by
+        id, so ObjectIndex can memory-map the file and binary search the
+        ids without loading anything, then the frames' offsets in the json
+        and in the compressed file.  The file name is recorded without its
+        folder; the json is always next to the index.
+        """
+        (ids, offsets, lengths) = (self.ids, self.offsets, self.lengths)
+        if any(ids[i] >= ids[i + 1] for i in range(len(ids) - 1)):
+            order = sorted(range(len(ids)), key=ids.__getitem__)
+            (ids, offsets, lengths) = (array('q', (column[i] for i in order)) for column in (ids, offsets, lengths))
+        frame_columns = [array('q', (frame[i] for frame in self.frames)) for i in (0, 1)]
+        name = os.path.basename(self.json_filename).encode('utf-8')
+        codec = (filename_codec(self.json_filename) or "").encode('ascii')
+        temporary_filename = index_filename + ".tmp"
+        with open(temporary_filename, "wb") as outfile:
+            outfile.write(OBJECT_INDEX_HEADER.pack(OBJECT_INDEX_MAGIC, OBJECT_INDEX_VERSION, len(ids), self.json_size, len(self.frames), codec, len(name)))
+            outfile.write(name + b"\0" * (-len(name) % 8))
+            for column in [ids, offsets, lengths] + frame_columns:
+                column.tofile(outfile)
+        os.replace(temporary_filename, index_filename)
+        return index_filename
+
+
+def write_object_index(offsets, index_filename, json_filename, final_json_filename=None):
+    """
+    Saves offsets (an ObjectOffsets) for json_filename as MyMap_objects.idx;
+    if the json is about to be renamed, final_json_filename is the name the
+    index should point to.  If nothing was
+    gathered while reading (a streaming parser, --pipeline, naya with
+    --workers), the objects are cut out of the json once more just for
+    this, which only looks for object boundaries.  Returns how many
+    objects were indexed, or None if the json's layout doesn't allow it
+    (see find_objects_array), in which case any old index is removed.
+    """
+    if not len(offsets):
+        try:
+            for (offset, raw) in iter_object_slices(json_filename):
+                offsets.add(offset, raw)
+        except ValueError as e:
+            print("    {}, so there's no {}".format(e, index_filename), flush=True)
+            if os.path.exists(index_filename):
+                os.remove(index_filename)
+            return None
+    offsets.json_filename = final_json_filename or json_filename
+    offsets.json_size = os.path.getsize(json_filename)
+    offsets.write(index_filename)
+    return len(offsets)
+
+
+class ObjectIndex:
+    """
+    Fetches single game objects by id from MyMap.json, using the
+    MyMap_objects.idx an earlier run wrote (see ObjectOffsets), without
+    reading anything else: both files are memory-mapped, the id is found
+    by binary search, and only that object's bytes are decoded.
+
+    If the json has been compressed since (--compress), the index also
+    says where each of its gzip members or zstd frames starts (see
+    compress_file), and only the one or two holding the object are
+    decompressed.  get() can be called from several threads at once, like
+    the reports do.
+
+    The index records which json it was written for, and that's the one
+    opened, unless json_filename says otherwise.
+    """
+    def __init__(self, index_filename, json_filename=None):
+        self.index_filename = index_filename
+        with open(index_filename, 'rb') as infile:
+            self.index_map = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, version, count, json_size, frame_count, codec, name_length) = OBJECT_INDEX_HEADER.unpack_from(self.index_map)
+            name = bytes(self.index_map[OBJECT_INDEX_HEADER.size:OBJECT_INDEX_HEADER.size + name_length]).decode('utf-8')
+        except (struct.error, UnicodeDecodeError):
+            (magic, version) = (None, None)
+        if magic != OBJECT_INDEX_MAGIC or version != OBJECT_INDEX_VERSION:
+            self.index_map.close()
+            raise ValueError("{} was written by a different version of the script; run it on the save again.".format(index_filename))
+        if json_filename is None:
+            json_filename = os.path.join(os.path.dirname(index_filename), name)
+        if not os.path.isfile(json_filename):
+            self.index_map.close()
+            raise FileNotFoundError("{} is gone (--delete-intermediates?), so there's nothing to look objects up in.".format(json_filename))
+        self.json_filename = json_filename
+        self.codec = filename_codec(json_filename)
+        if self.codec != (codec.rstrip(b"\0").decode('ascii') or None):
+            self.index_map.close()
+            raise ValueError("{} isn't compressed the way it was when {} was written; run the script on the save again.".format(json_filename, index_filename))
+        columns = memoryview(self.index_map)[OBJECT_INDEX_HEADER.size + name_length + (-name_length % 8):].cast('q')
+        (self.ids, self.offsets, self.lengths) = (columns[:count], columns[count:2 * count], columns[2 * count:3 * count])
+        frames_start = 3 * count
+        (self.frame_offsets, self.frame_disk_offsets) = (columns[frames_start:frames_start + frame_count],
+                                                          columns[frames_start + frame_count:frames_start + 2 * frame_count])
+        columns.release()
+
+        self.json_map = None
+        if self.codec is not None:
+            if not frame_count:
+                self.close()
+                raise ValueError("{} wasn't compressed by the script, so objects can't be found in it; decompress it first.".format(json_filename))
+        else:
+            if os.path.getsize(json_filename) != json_size:
+                self.close()
+                raise ValueError("{} has changed since {} was written; run the script on the save again.".format(json_filename, index_filename))
+            with open(json_filename, 'rb') as infile:
+                self.json_map = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, objectId):
+        return self.find(objectId) is not None
+
+    def find(self, objectId):
+        """ The position of objectId in the index, or None if there's no such game object. """
+        if 0 <= objectId < len(self.ids) and self.ids[objectId] == objectId:
+            return objectId  # ids are positions in the objects array, so this is nearly always it
+        position = bisect.bisect_left(self.ids, objectId)
+        if position < len(self.ids) and self.ids[position] == objectId:
+            return position
+        return None
+
+    def raw(self, objectId):
+        """ The game object's json, as bytes, or None if there's no such game object. """
+        position = self.find(objectId)
+        if position is None:
+            return None
+        (offset, length) = (self.offsets[position], self.lengths[position])
+        if self.json_map is not None:
+            return self.json_map[offset:offset + length]
+        frame = bisect.bisect_right(self.frame_offsets, offset) - 1
+        compressed = DecompressingFile(self.json_filename, self.codec)
+        compressed.file.seek(self.frame_disk_offsets[frame])
+        with io.BufferedReader(compressed, CODEC_CHUNK_BYTES) as stream:
+            stream.read(offset - self.frame_offsets[frame])
+            return stream.read(length)
+
+    def get(self, objectId):
+        """
+        The game object with that id, decoded, just as the json has it (all
+        its properties, not only the ones the reports keep); None if there's
+        no such game object.
+        """
+        raw = self.raw(objectId)
+        if raw is None:
+            return None
+        try:
+            gameobject = json.loads(raw)
+        except ValueError:
+            gameobject = None
+        if not isinstance(gameobject, dict) or gameobject.get('id') != objectId:
+            raise ValueError("{} doesn't match {} anymore; run the script on the save again.".format(self.json_filename, self.index_filename))
+        return gameobject
+
+    def close(self):
+        for view in (self.ids, self.offsets, self.lengths, self.frame_offsets, self.frame_disk_offsets):
+            view.release()
+        self.index_map.close()
+        if self.json_map is not None:
+            self.json_map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_object_index(ark_binary_filename):
+    """
+    An ObjectIndex for the save's MyMap_objects.idx and whichever json it
+    was written for: MyMap.json, or the compressed MyMap.json.gz or .zst.
+    """
+    index_filename = ark_binary_filename.replace(".ark", "_objects.idx")
+    if not os.path.isfile(index_filename):
+        raise FileNotFoundError("No object index at {}; run the script on the save first.".format(index_filename))
+    return ObjectIndex(index_filename)
+
+
+def print_object_lookup(ark_binary_filename, objectIds):
+    """ --object: prints each game object as the json has it. """
+    with open_object_index(ark_binary_filename) as index:
+        for objectId in objectIds:
+            gameobject = index.get(objectId)
+            if gameobject is None:
+                print("No game object {} in {}".format(objectId, index.json_filename))
+            else:
+                print(json.dumps(gameobject, indent=2))
+
+
+def forget_object(state, objectId, objtype, className):
+    """ Takes one classified game object back out of the maps. """
+    state.object_type_counts[objtype] = state.object_type_counts.get(objtype, 0) - 1
+    if (objtype == "InventoryOwner"):
+        owner = state.owners.pop(objectId, None)
+        if owner is not None:
+            grid_remove(state.owner_cells, objectId, owner.x, owner.y)
+    if (objtype == "Inventory"):
+        state.inventories.pop(objectId, None)
+    if (objtype == "ItemStack"):
+        state.itemstacks.pop(objectId, None)
+    if (objtype == "TameDinosaur"):
+        dino = state.tame_dinos.pop(objectId, None)
+        if dino is not None:
+            grid_remove(state.tame_cells, objectId, dino.x, dino.y)
+    if (objtype == "DinosaurStatus"):
+        state.dino_status.pop(objectId, None)
+    if (objtype == "miscellaneous"):
+        remaining = state.miscellaneous.get(className, 0) - 1
+        if remaining > 0:
+            state.miscellaneous[className] = remaining
+        else:
+            state.miscellaneous.pop(className, None)
+
+
+def reorder_game_object_state(state):
+    """
+    After objects have been taken out and put back, puts the maps back in
+    id order (the order the converter writes objects in) and rebuilds the
+    inventory->owners lookup, so the reports come out in the same order a
+    full run would give.
+    """
+    state.owners = dict(sorted(state.owners.items()))
+    state.inventories = dict(sorted(state.inventories.items()))
+    state.itemstacks = dict(sorted(state.itemstacks.items()))
+    state.tame_dinos = dict(sorted(state.tame_dinos.items()))
+    state.dino_status = dict(sorted(state.dino_status.items()))
+    state.inventory_to_owner_reverse_lookup = dict()
+    for owner in state.owners.values():
+        register_owner(state, owner)
+
+
+def process_game_objects_incremental(state, json_filename, totalObjectsCount, parser='auto', offsets=None):
+    """
+    Brings the maps in state, as loaded from the previous run's cache, up to
+    date with a new save of the same map.  Every game object's raw json is
+    hashed; an object whose digest we saw last time is unchanged (the raw
+    json includes its id), so only added and changed objects are parsed and
+    classified, and objects that are gone are taken back out.
+
+    Ids are positions in the converter's objects array, so when the game
+    inserts objects early in the array everything after shifts and counts
+    as changed.  The result is still right, just less incremental.
+
+    The objects that have to be parsed are decoded with the json module,
+    unless parser is 'naya'.  Where every object was goes into offsets, an
+    ObjectOffsets, if one is passed in.
+
+    Returns (added, changed, removed) counts.
+    """
+    previous = state.object_digests
+    previous_by_id = dict((entry[0], digest) for (digest, entry) in previous.items())
+    current = dict()
+    (added, changed) = (0, 0)
     count = 0
+    progress = ProgressPrinter(totalObjectsCount)
+
+    for (offset, raw) in iter_object_slices(json_filename):
+        if offsets is not None:
+            offsets.add(offset, raw)
+        digest = object_digest(raw)
+        entry = previous.get(digest, None)
+        if entry is None:
+            gameobject = decode_game_object(raw, parser)
+            objectId = gameobject['id']
+            old_digest = previous_by_id.get(objectId, None)
+            if old_digest is not None and old_digest not in current:
+                forget_object(state, *previous[old_digest])
+                current[old_digest] = None  # consumed; see the removal pass below
+                changed = changed + 1
+            else:
+                added = added + 1
+            objtype = handle_object(state, gameobject)
+            entry = (objectId, objtype, intern_text(gameobject['class']) if objtype == "miscellaneous" else None)
+        current[digest] = entry
+        count = count + 1
+        progress.update(count)
+    progress.done(count)
+
+    removed = 0
+    for (digest, entry) in previous.items():
+        if digest not in current:
+            forget_object(state, *entry)
+            removed = removed + 1
+    state.object_digests = dict((digest, entry) for (digest, entry) in current.items() if entry is not None)
+    reorder_game_object_state(state)
+    return (added, changed, removed)
+
+
+def delta_snapshot(state, values_by_bp, multipliers=None):
+    """
+    The parts of the reports the delta report compares between two saves:
+    where each reported item stack is, and which tames are hungry.
+    """
+    items = dict()
+    for (owner, inventoryObject, stacks) in iter_inventory_contents(state):
+        for stack in stacks:
+            items[stack.id] = (simplifyName(stack.className), owner)
+    hungry = dict()
+    for (dino, food) in iter_tame_food(state, values_by_bp, multipliers):
+        if food['percent'] < HUNGRY_FOOD_PERCENT:
+            hungry[dino.id] = (dino, food['percent'])
+    return {'items': items, 'hungry': hungry}
+
+
+def describeOwner(owner):
+    return "{} {} at {} {} {}".format(simplifyName(owner.className), owner.id, owner.x, owner.y, owner.z)
+
+
+def report_delta(delta_filename, before, after):
+    """
+    Lists what changed between the previous save and this one: item stacks
+    that moved, appeared or went away, and tames that became hungry or
+    got fed.
+    """
+    with open(delta_filename, "w") as outfile:
+        header = "Change\tID\tClass\tBefore\tAfter\n"
+        outfile.write(header)
 
-    with open(json_objects_filename) as data:
-        gameobjects = naya.stream_array(naya.tokenize(data))
-        for gameobject in gameobjects:
-            handle_object(gameobject)
-            count = count + 1
-            percent = (count * 100.0 / totalObjectsCount)
-            if (count % 500 == 0):
-                time.sleep(0.01)
-                print('{:2.2f}%   '.format(percent), end="\r", flush=True)
-    print("")
+        for stackId in after['items']:
+            (itemName, owner) = after['items'][stackId]
+            if stackId not in before['items']:
+                outfile.write("ItemAdded\t" + str(stackId) + "\t" + itemName + "\t\t" + describeOwner(owner) + "\n")
+            elif before['items'][stackId][1].id != owner.id:
+                outfile.write("ItemMoved\t" + str(stackId) + "\t" + itemName + "\t" + describeOwner(before['items'][stackId][1]) + "\t" + describeOwner(owner) + "\n")
+        for stackId in before['items']:
+            if stackId not in after['items']:
+                (itemName, owner) = before['items'][stackId]
+                outfile.write("ItemRemoved\t" + str(stackId) + "\t" + itemName + "\t" + describeOwner(owner) + "\t\n")
+
+        for dinoId in after['hungry']:
+            if dinoId not in before['hungry']:
+                (dino, percent) = after['hungry'][dinoId]
+                outfile.write("TameBecameHungry\t" + str(dinoId) + "\t" + simplifyName(dino.className) + "\t\t" + "{} food {:2.1f}%".format(dino.tamedName, 100.0 * percent) + "\n")
+        for dinoId in before['hungry']:
+            if dinoId not in after['hungry']:
+                (dino, percent) = before['hungry'][dinoId]
+                outfile.write("TameNoLongerHungry\t" + str(dinoId) + "\t" + simplifyName(dino.className) + "\t" + "{} food {:2.1f}%".format(dino.tamedName, 100.0 * percent) + "\t\n")
+    return delta_filename
 
 
 def extractObjectCount(returned_output):
@@ -490,6 +2906,176 @@ def convert_binary_to_json(ark_binary_filename, json_full_filename):
     print("Total objects: " + totalObjectsCount)
     return int(totalObjectsCount)
 
+class FollowingFile(io.RawIOBase):
+    """
+    Reads a file that another process is still writing, like tail -f.  At
+    the end of what has been written so far, a read waits for more instead
+    of returning end-of-file, until the writer process has exited.  Wrap it
+    in io.BufferedReader and io.TextIOWrapper so the waiting only happens
+    once per buffer and not once per character.
+
+    The file doesn't have to exist yet; reads wait for it to show up.
+    """
+    def __init__(self, filename, writer, poll_seconds=FOLLOW_POLL_SECONDS):
+        self.filename = filename
+        self.writer = writer
+        self.poll_seconds = poll_seconds
+        self.file = None
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while True:
+            writer_done = self.writer.poll() is not None  # checked first, so no bytes written before it exited are missed
+            if self.file is None and os.path.exists(self.filename):
+                self.file = open(self.filename, 'rb', buffering=0)
+            if self.file is not None:
+                count = self.file.readinto(buffer)
+                if count:
+                    return count
+            if writer_done:
+                return 0
+            time.sleep(self.poll_seconds)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+        super().close()
+
+
+def convert_and_process_pipelined(state, ark_binary_filename, json_full_filename, parser='auto'):
+    """
+    Stages 1 and 3 at the same time: starts the converter and reads game
+    objects out of its json while it's still being written, so the whole
+    thing takes about as long as the slower of the two instead of both
+    added together.  The converter only says how many objects there are
+    once it's done, so progress is a plain count until then.
+
+    If the json can't be opened while the converter has it open (Windows
+    can refuse), this waits for the converter and reads the json after,
+    the same as the normal path.
+
+    Returns (totalObjectsCount, objects processed), with None for the
+    second when the game objects still have to be processed.
+    """
+    if os.path.isfile(json_full_filename) and os.path.exists(json_full_filename):
+        os.remove(json_full_filename)
+    command = ["./ArkBinaryToJsonConvertor.exe", ark_binary_filename, json_full_filename]
+    count = None
+    with tempfile.TemporaryFile() as output:
+        converter = subprocess.Popen(command, stdout=output, stderr=subprocess.STDOUT)
+        try:
+            with io.BufferedReader(FollowingFile(json_full_filename, converter)) as data:
+                count = process_game_object_stream(state, data, None, parser)
+        except PermissionError:
+            print("    Can't read {} while it's being written; waiting for the converter to finish.".format(json_full_filename), flush=True)
+            state.clear()
+        except ValueError:
+            if converter.wait() == 0:
+                raise
+            # the converter failed part way through; its error is more useful than ours
+        returncode = converter.wait()
+        output.seek(0)
+        returned_output = output.read().decode("utf-8").strip()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, command, output=returned_output)
+    print(re.sub("^", "    ", returned_output, flags=re.MULTILINE)) # nice indent on output from subprocess
+    totalObjectsCount = extractObjectCount(returned_output)
+    print("Total objects: " + totalObjectsCount)
+    return (int(totalObjectsCount), count)
+
+def save_fingerprint(ark_binary_filename, with_hash=True):
+    """
+    Identifies one particular save: size and mtime are cheap to check,
+    and the content hash catches a save that was replaced in place.
+    """
+    stat = os.stat(ark_binary_filename)
+    fingerprint = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'sha256': None}
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(ark_binary_filename, 'rb') as data:
+            for block in iter(lambda: data.read(1024 * 1024), b''):
+                digest.update(block)
+        fingerprint['sha256'] = digest.hexdigest()
+    return fingerprint
+
+
+class _StateUnpickler(pickle.Unpickler):
+    """
+    Only lets the cache load our own record classes, whichever module
+    name (__main__ or ConvertAndAnalyzeArkSave) they were pickled under.
+    """
+    allowed = ('OwnerRecord', 'InventoryRecord', 'ItemStackRecord', 'TameRecord', 'DinoStatusRecord')
+
+    def find_class(self, module, name):
+        if name in self.allowed:
+            return globals()[name]
+        if module == 'array' and name in ('array', '_array_reconstructor'):
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError("Unexpected {}.{} in cache file".format(module, name))
+
+
+def save_cached_state(state, cache_filename, fingerprint, totalObjectsCount, ark_binary_filename=None):
+    """
+    Writes the classified game objects out so a later run on the same,
+    unchanged save can skip converting and parsing altogether.  The small
+    header goes first so a stale cache is spotted without reading the rest.
+
+    fingerprint is the save's from before it was read.  If the game has
+    saved again since (checked when ark_binary_filename is given), state
+    is from the older save, so nothing is written and None is returned;
+    otherwise the next run would take it for the new save's.
+    """
+    if ark_binary_filename is not None:
+        current = save_fingerprint(ark_binary_filename, with_hash=False)
+        if (current['size'], current['mtime']) != (fingerprint['size'], fingerprint['mtime']):
+            print("    {} changed while it was being read, so it isn't cached.".format(ark_binary_filename), flush=True)
+            return None
+    header = {'classifierVersion': CLASSIFIER_VERSION, 'classifierRules': classifier_rules_digest(), 'fingerprint': fingerprint,
+              'totalObjectsCount': totalObjectsCount}
+    temporary_filename = cache_filename + ".tmp"
+    with open(temporary_filename, 'wb') as outfile:
+        pickle.dump(header, outfile, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(state.game_objects(), outfile, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_filename, cache_filename)
+    return cache_filename
+
+
+def load_cached_state(state, cache_filename, ark_binary_filename, require_same_save=True):
+    """
+    Loads the classified game objects into state from the cache if it was built from
+    this exact save by this classifier version with the same rule tables
+    (see classifier_rules_digest).  Returns the cached object
+    count, or None if there's no usable cache (and the caller should do
+    the full conversion).
+
+    With require_same_save=False, whatever save the cache was built from is
+    loaded; the incremental mode uses that as the baseline to compare with.
+    """
+    if not os.path.isfile(cache_filename):
+        return None
+    try:
+        with open(cache_filename, 'rb') as data:
+            header = _StateUnpickler(data).load()
+            if header.get('classifierVersion') != CLASSIFIER_VERSION or header.get('classifierRules') != classifier_rules_digest():
+                return None
+            if require_same_save:
+                cached = header['fingerprint']
+                current = save_fingerprint(ark_binary_filename, with_hash=False)
+                if cached['size'] != current['size'] or cached['mtime'] != current['mtime']:
+                    return None
+                if cached['sha256'] != save_fingerprint(ark_binary_filename)['sha256']:
+                    return None
+            cached_objects = _StateUnpickler(data).load()
+    except (OSError, EOFError, KeyError, AttributeError, pickle.UnpicklingError) as e:
+        print("    Ignoring unreadable cache {}: {}".format(cache_filename, e))
+        return None
+    state.clear()
+    state.merge(cached_objects)
+    return header['totalObjectsCount']
+
+
 def iprint(text):
     """
     Prints a message to screen and immediately flushes the 
@@ -499,60 +3085,978 @@ def iprint(text):
     print(text)
     sys.stdout.flush()
 
-def main_conversion(ark_binary_filename):
+def convert_and_process(state, ark_binary_filename, json_full_filename, json_objects_filename, write_game_objects=False, workers=1, incremental=False, metrics=None, pipeline=False, parser='auto', offsets=None):
+    """
+    Stages 1-3: converts the save to json and reads the game objects from
+    it into state, a GameState.  Returns the converter's object count.
+
+    With incremental=True the maps are updated in place from whatever the
+    previous run left in state; see process_game_objects_incremental.
+    With pipeline=True, game objects are read while the converter is still
+    writing them; see convert_and_process_pipelined.  That reads serially,
+    so workers doesn't apply, and incremental needs the finished json, so
+    it wins over pipeline.
+    parser picks the json parser backend; see choose_parser.
+    Where each game object is in the json goes into offsets, an
+    ObjectOffsets, if one is passed in and the reader can tell.
+    Each stage is timed into metrics, a RunMetrics, if one is passed in.
+    """
+    if metrics is None:
+        metrics = RunMetrics(ark_binary_filename, state)
+
+    processed = None
+    if pipeline and incremental:
+        print("    --incremental needs the finished json, so conversion and processing won't overlap.", flush=True)
+    if pipeline and not incremental:
+        with metrics.stage("convert_and_process", reads=[ark_binary_filename], writes=[json_full_filename]) as stage:
+            print("1+3/6 Converting {} and processing game objects as the json is written; several minutes...".format(ark_binary_filename), flush=True)
+            stream_parser = choose_parser(parser)
+            (totalObjectsCount, processed) = convert_and_process_pipelined(state, ark_binary_filename, json_full_filename, stream_parser)
+            stage.objects = totalObjectsCount
+            print("1/6 Wrote {}\n".format(json_full_filename), flush=True)
+        if processed is not None:
+            metrics.notes.update({'process_mode': 'pipeline', 'parser': stream_parser})
+    else:
+        with metrics.stage("convert", reads=[ark_binary_filename], writes=[json_full_filename]) as stage:
+            print("1/6 Converting {} from binary to json; this takes a minute...".format(ark_binary_filename), flush=True)
+            totalObjectsCount = convert_binary_to_json(ark_binary_filename, json_full_filename)
+            stage.objects = totalObjectsCount
+            print("1/6 Wrote {}\n".format(json_full_filename), flush=True)
+
+    if write_game_objects:
+        with metrics.stage("simplify", reads=[json_full_filename], writes=[json_objects_filename]) as stage:
+            print("2/6 Simplifying json so we can read the game objects...", flush=True)
+            simplify_json_to_game_objects(json_full_filename, json_objects_filename)
+            stage.objects = totalObjectsCount
+            print("2/6 Wrote {}\n".format(json_objects_filename), flush=True)
+    else:
+        print("2/6 Skipped; game objects are streamed straight from {}\n".format(json_full_filename), flush=True)
+
+    if processed is not None:
+        return totalObjectsCount
+
+    with metrics.stage("process", reads=[json_full_filename]) as stage:
+        if incremental:
+            if state.object_digests:
+                print("3/6 Processing only the game objects that changed since the previous save...", flush=True)
+            else:
+                print("3/6 Processing game objects and remembering them for next time; several minutes...", flush=True)
+            try:
+                (added, changed, removed) = process_game_objects_incremental(state, json_full_filename, totalObjectsCount, parser, offsets)
+                print("    {} added, {} changed, {} removed\n".format(added, changed, removed), flush=True)
+                metrics.notes.update({'process_mode': 'incremental', 'parser': 'naya' if parser == 'naya' else 'slices',
+                                      'added': added, 'changed': changed, 'removed': removed})
+                stage.objects = totalObjectsCount
+                return totalObjectsCount
+            except ValueError as e:
+                print("    {}; processing every game object instead.".format(e), flush=True)
+                state.clear()
+                if offsets is not None:
+                    offsets.clear()
+
+        print("3/6 Processing game objects. This takes the longest time; several minutes...", flush=True)
+        parser = choose_parser(parser, json_full_filename)
+        if workers > 1:
+            metrics.notes.update({'process_mode': 'parallel', 'workers': workers, 'parser': 'naya' if parser == 'naya' else 'slices'})
+            stage.objects = process_game_objects_parallel(state, json_full_filename, totalObjectsCount, workers, parser, offsets) # purely in-memory
+        else:
+            metrics.notes.update({'process_mode': 'serial', 'parser': parser})
+            stage.objects = process_game_objects(state, json_full_filename, totalObjectsCount, parser, offsets) # purely in-memory
+    return totalObjectsCount
+
+
+def main_conversion(ark_binary_filename, write_game_objects=False, workers=1, use_cache=True, incremental=False, pipeline=False, multipliers=None, values_by_bp=None, low_memory=False, memory_ceiling_mb=LOW_MEMORY_CEILING_MB, parser='auto', reports=None, compression=None, delete_intermediates=False):
     """
     The main entry point if you import this in a library; this
     will take a Map.ark file, convert it to json, process the
     json into in-memory sets, and report on the inventories.
     Output goes to similarly named files.
+
+    Game objects are streamed straight out of the converter's json.
+    Pass write_game_objects=True to also write the old simplified
+    _game_objects.json (handy for poking at by hand); nothing in the
+    pipeline reads it anymore.
+
+    With workers above 1, game objects are parsed in that many processes;
+    see process_game_objects_parallel.
+
+    The classified game objects are cached in MyMap_cache.pickle.  When the
+    save hasn't changed since, stages 1-3 are skipped and the cache is
+    loaded instead; pass use_cache=False to always start from scratch.
+
+    With incremental=True, a changed save is compared object by object with
+    the one the cache was built from.  Only the differences are processed,
+    and MyMap_delta.txt lists the items that moved and the tames that
+    became hungry in between.
+
+    With pipeline=True, game objects are processed while the converter is
+    still writing the json instead of after; see convert_and_process_pipelined.
+
+    multipliers holds the server's stat multipliers for the hungry tames
+    report; see DEFAULT_SERVER_MULTIPLIERS.  values_by_bp is the species
+    table from load_values_json, if you already have it loaded.
+
+    parser picks how the json is parsed: 'auto' (the fastest available),
+    'slices', 'ijson' or 'naya'; see choose_parser.  They all give the same
+    result.
+
+    With low_memory=True, owners, inventories and item stacks are kept in
+    MyMap_spill.sqlite instead of in memory, using at most about
+    memory_ceiling_mb for them; see SpilledGameState.  That rules out the
+    cache and incremental mode, and the file is deleted at the end.
+
+    Every stack in the inventory report also goes into MyMap_items.sqlite,
+    for looking items up later without the save; see ItemIndex.
+
+    The reports are the ones registered with add_report, written at the
+    same time; see run_reports.  reports picks which of them to write (all
+    of them by default).  With only some, game objects none of them need
+    are skipped while reading; see ReportPlan.  The state is then
+    incomplete, so it isn't cached, and there's no incremental processing.
+
+    compression ('gzip' or 'zstd') compresses the text reports and
+    _game_objects.json as they're written, and the converter's json once
+    the game objects have been read from it; see choose_codec.  The
+    converter itself can only write plain json.  With
+    delete_intermediates=True, the json files are deleted at that point
+    instead.  Nothing reads them after stage 3.  Either way, copies of the
+    json an earlier run compressed differently are deleted then too.
+
+    Where each game object is in MyMap.json goes into MyMap_objects.idx,
+    so single objects can be looked up later without reading the rest;
+    see ObjectIndex.  The reports get it as context['objects'] (None if
+    there isn't one) for anything they'd rather fetch than keep around.
+    With delete_intermediates there's no json to look in, so no index.
+
+    Timings, memory and object counts for every stage go to
+    MyMap_metrics.json; see RunMetrics.
+
+    Returns the GameState with everything that was read and reported
+    (closed already, in low-memory mode).
     """
     start_time_seconds = round(time.time())
+    codec = choose_codec(compression)
+    reports = report_names() if reports is None else tuple(report for report in report_names() if report in reports)
+    plan = ReportPlan(reports) if reports != report_names() else None
+    if plan is not None and incremental:
+        print("    Only some reports were asked for, so there's no incremental processing.", flush=True)
+        incremental = False
+    if low_memory:
+        if use_cache or incremental:
+            print("    --low-memory keeps game objects on disk, so there's no cache and no incremental processing.", flush=True)
+        (use_cache, incremental) = (False, False)
+        state = SpilledGameState(ark_binary_filename.replace(".ark", "_spill.sqlite"), memory_ceiling_mb)
+    else:
+        state = GameState()
+    metrics = RunMetrics(ark_binary_filename, state)
+    metrics.notes['low_memory'] = low_memory
+    metrics.notes['reports'] = list(reports)
+    metrics.notes['compression'] = codec
 
     json_full_filename = ark_binary_filename.replace(".ark", ".json")
-    json_objects_filename = ark_binary_filename.replace(".ark", "_game_objects.json")
-    inventory_filename = ark_binary_filename.replace(".ark", "_inventory.txt")
-    hungry_tames_filename = ark_binary_filename.replace(".ark", "_hungry_tames.txt")
-    low_fuel_filename = ark_binary_filename.replace(".ark", "_low_fuel.txt")
+    json_objects_filename = compressed_filename(ark_binary_filename.replace(".ark", "_game_objects.json"), codec)
+    cache_filename = ark_binary_filename.replace(".ark", "_cache.pickle")
+    object_index_filename = ark_binary_filename.replace(".ark", "_objects.idx")
+    delta_filename = ark_binary_filename.replace(".ark", "_delta.txt")
+    metrics_filename = ark_binary_filename.replace(".ark", "_metrics.json")
+
+    totalObjectsCount = None
+    delta_before = None
+    if use_cache:
+        with metrics.stage("load_cache", reads=[cache_filename]) as stage:
+            totalObjectsCount = load_cached_state(state, cache_filename, ark_binary_filename)
+            stage.objects = totalObjectsCount
+    metrics.notes['cache_hit'] = totalObjectsCount is not None
+    if totalObjectsCount is not None:
+        print("1-3/6 {} is unchanged; loaded its game objects from {}\n".format(ark_binary_filename, cache_filename), flush=True)
+    else:
+        if incremental:
+            with metrics.stage("load_baseline", reads=[cache_filename]) as stage:
+                if load_cached_state(state, cache_filename, ark_binary_filename, require_same_save=False) is not None and state.object_digests:
+                    if values_by_bp is None:
+                        values_by_bp = load_values_json()
+                    delta_before = delta_snapshot(state, values_by_bp, multipliers)
+                else:
+                    state.clear()  # no usable baseline; this run becomes the baseline
+        fingerprint = save_fingerprint(ark_binary_filename)  # before stage 1, so a save written during the run doesn't get this one's cache
+        state.plan = plan
+        offsets = None if delete_intermediates else ObjectOffsets()
+        totalObjectsCount = convert_and_process(state, ark_binary_filename, json_full_filename, json_objects_filename, write_game_objects, workers, incremental, metrics, pipeline, parser, offsets)
+        state.plan = None
+        if (use_cache or incremental) and plan is None:
+            with metrics.stage("save_cache", writes=[cache_filename]):
+                save_cached_state(state, cache_filename, fingerprint, totalObjectsCount, ark_binary_filename)
+        indexed = None
+        if offsets is not None:
+            with metrics.stage("object_index", reads=[] if len(offsets) else [json_full_filename], writes=[object_index_filename]) as stage:
+                stage.objects = indexed = write_object_index(offsets, object_index_filename, json_full_filename)
+            if indexed is not None:
+                print("Wrote {}\n".format(object_index_filename), flush=True)
+        if delete_intermediates:
+            for filename in remove_old_copies(json_full_filename) + remove_old_copies(json_objects_filename) + remove_old_copies(object_index_filename):
+                print("Deleted {}".format(filename), flush=True)
+            print("", flush=True)
+        else:
+            json_kept_filename = json_full_filename
+            if codec is not None:
+                with metrics.stage("compress_json", writes=[compressed_filename(json_full_filename, codec)]):
+                    print("Compressing {}...".format(json_full_filename), flush=True)
+                    json_kept_filename = compress_file(json_full_filename, codec, offsets.frames if indexed is not None else None)
+                    print("Wrote {}\n".format(json_kept_filename), flush=True)
+                    if indexed is not None:
+                        offsets.json_filename = json_kept_filename
+                        offsets.write(object_index_filename)  # now with where the frames start
+            for filename in remove_old_copies(json_full_filename, keep=json_kept_filename):
+                print("Deleted {}, left from an earlier run".format(filename), flush=True)
+
+    if values_by_bp is None and (delta_before is not None or any(REPORTS[report].uses_values for report in reports)):
+        values_by_bp = load_values_json()
+    try:
+        objects = open_object_index(ark_binary_filename)
+    except (OSError, ValueError):
+        objects = None  # deleted, or not written yet when the cache was; the reports don't need it
+    print("4-6/6 Writing reports: {}...".format(", ".join(reports)), flush=True)
+    try:
+        run_reports(state, reports, ark_binary_filename, {'multipliers': multipliers, 'values_by_bp': values_by_bp, 'objects': objects}, metrics, codec)
+    finally:
+        if objects is not None:
+            objects.close()
+    print("", flush=True)
+
+    if delta_before is not None:
+        with metrics.stage("delta", writes=[delta_filename]):
+            print("Reporting changes since the previous save...", flush=True)
+            report_delta(delta_filename, delta_before, delta_snapshot(state, values_by_bp, multipliers))
+            print("Wrote {}\n".format(delta_filename), flush=True)
+
+    if low_memory:
+        state.close()
+    metrics.write(metrics_filename)
+    print("Wrote {}".format(metrics_filename), flush=True)
+    end_time_seconds = round(time.time())
+
+    #print("Unhandled types:")  # These have been verified as non-inventory as of July 2020.
+    #pprint(state.miscellaneous)
+
+    minutes = (end_time_seconds - start_time_seconds)/60.0
+    print("Completed in " + str(minutes) + " minutes.", flush=True)
+    return state
 
-    print("1/6 Converting {} from binary to json; this takes a minute...".format(ark_binary_filename), flush=True)
-    totalObjectsCount = convert_binary_to_json(ark_binary_filename, json_full_filename)
-    print("1/6 Wrote {}\n".format(json_full_filename), flush=True)
 
-    print("2/6 Simplifying json so we can read the game objects...", flush=True)
-    simplify_json_to_game_objects(json_full_filename, json_objects_filename)
-    print("2/6 Wrote {}\n".format(json_objects_filename), flush=True)
+def find_ark_files(path_or_pattern):
+    """ All the .ark files in a directory, or the ones matching a glob like saves/*.ark. """
+    if os.path.isdir(path_or_pattern):
+        path_or_pattern = os.path.join(path_or_pattern, "*.ark")
+    return sorted(glob.glob(path_or_pattern))
 
-    print("3/6 Processing game objects. This takes the longest time; several minutes...", flush=True)
-    process_game_objects(json_objects_filename, totalObjectsCount) # purely in-memory
 
-    print("4/6 Reporting inventories...", flush=True)
-    report_inventories(inventory_filename)
-    print("4/6 Wrote {}\n".format(inventory_filename), flush=True)
+def private_memory_bytes():
+    """
+    How much memory this process has allocated for itself right now: its
+    resident memory minus the pages it shares with files, so the parts of
+    a memory-mapped json it has read don't count (the kernel can drop those
+    whenever it needs the room).  None where /proc/self/statm doesn't exist
+    (anywhere but Linux).
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            fields = statm.read().split()
+        return (int(fields[1]) - int(fields[2])) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
 
-    print("5/6 Reporting hungry tames...", flush=True)
-    report_hungry_tames(hungry_tames_filename)
-    print("5/6 Wrote {}\n".format(hungry_tames_filename), flush=True)
 
-    print("6/6 Reporting low-fuel generators...", flush=True)
-    report_low_fuel_generators(low_fuel_filename)
-    print("6/6 Wrote {}\n".format(low_fuel_filename), flush=True)
+MEMORY_WATCH_SECONDS = 0.25
 
-    end_time_seconds = round(time.time())
+class MemoryWatchdog:
+    """
+    --memory-limit-mb for one batch process.  A thread looks at
+    private_memory_bytes every MEMORY_WATCH_SECONDS and, if it's over the
+    limit while a map is being worked on (between start_map and stop_map),
+    interrupts the process's main thread, so that map fails and the next
+    one gets a fresh start.  Memory can overshoot by whatever gets allocated
+    between two looks, and the converter runs in its own process, which
+    isn't counted.
+    """
+    def __init__(self, limit_bytes):
+        self.limit_bytes = limit_bytes
+        self.lock = threading.Lock()
+        self.watching = False
+        self.tripped = False
+        threading.Thread(target=self.watch, daemon=True).start()
+
+    def watch(self):
+        while True:
+            time.sleep(MEMORY_WATCH_SECONDS)
+            used = private_memory_bytes()
+            with self.lock:
+                if self.watching and not self.tripped and used is not None and used > self.limit_bytes:
+                    self.tripped = True
+                    _thread.interrupt_main()
+
+    def start_map(self):
+        with self.lock:
+            self.watching = True
+            self.tripped = False
+
+    def stop_map(self):
+        """
+        Stops watching and says whether the map went over the limit.  An
+        interrupt that was sent just before the map finished may not have
+        arrived yet; it's waited for here so it can't hit whatever the
+        process does next.
+        """
+        try:
+            with self.lock:
+                self.watching = False
+                tripped = self.tripped
+            if tripped:
+                time.sleep(MEMORY_WATCH_SECONDS)
+        except KeyboardInterrupt:
+            pass
+        if tripped:
+            gc.collect()  # give the memory back before the next map starts
+        return tripped
+
+BATCH_MEMORY_WATCHDOG = None
+
+
+def limit_batch_process(memory_limit_mb):
+    """
+    Runs at the start of each batch process.  Starts a MemoryWatchdog so
+    one huge map can't take the whole machine down with it; that map fails
+    with a MemoryError and the rest carry on.  Only on Linux; see
+    private_memory_bytes.
+    """
+    global BATCH_MEMORY_WATCHDOG
+    if memory_limit_mb and private_memory_bytes() is not None:
+        BATCH_MEMORY_WATCHDOG = MemoryWatchdog(memory_limit_mb * 1024 * 1024)
 
-    #print("Unhandled types:")  # These have been verified as non-inventory as of July 2020.
-    #pprint(miscellaneous)
 
-    minutes = (end_time_seconds - start_time_seconds)/60.0
-    print("Completed in " + str(minutes) + " minutes.", flush=True)
+def run_batch_map(task):
+    """
+    Runs in a batch process: main_conversion for one map, with everything
+    it prints going to MyMap_log.txt so the maps don't talk over each other.
+    Returns (ark filename, error message or None, seconds).
+    """
+    (ark_binary_filename, options, values_by_bp, report_plugins) = task
+    log_filename = ark_binary_filename.replace(".ark", "_log.txt")
+    start_time_seconds = time.time()
+    watchdog = BATCH_MEMORY_WATCHDOG
+    error = None
+    try:
+        with open(log_filename, "w") as log:
+            with contextlib.redirect_stdout(log):
+                load_report_plugins(report_plugins)
+                if watchdog is not None:
+                    watchdog.start_map()
+                main_conversion(ark_binary_filename, values_by_bp=values_by_bp, **options)
+    except Exception as e:  # one broken map shouldn't stop the rest of the cluster
+        error = type(e).__name__ + (": {}".format(e) if str(e) else "")
+    except KeyboardInterrupt:
+        if watchdog is None or not watchdog.tripped:
+            raise
+    finally:
+        if watchdog is not None and watchdog.stop_map():
+            error = "MemoryError: went over --memory-limit-mb ({} MB)".format(watchdog.limit_bytes // (1024 * 1024))
+    return (ark_binary_filename, error, time.time() - start_time_seconds)
+
+
+def report_cluster(cluster_filename, map_reports):
+    """
+    Glues one report from every map into a single file, with the map's name
+    as an extra first column.  map_reports is a list of (map name, report
+    filename); the header comes from the first one.  Any of the files can
+    be compressed; see open_text_output.
+    """
+    with open_text_output(cluster_filename) as outfile:
+        header_written = False
+        for (mapName, report_filename) in map_reports:
+            with open_text_input(report_filename) as infile:
+                header = infile.readline()
+                if not header_written:
+                    outfile.write("Map\t" + header)
+                    header_written = True
+                for line in infile:
+                    outfile.write(mapName + "\t" + line)
+    return cluster_filename
+
+
+def main_batch(path_or_pattern, processes=None, memory_limit_mb=None, report_plugins=None, **options):
+    """
+    Runs main_conversion on every map of a cluster at the same time, in a
+    pool of processes, then writes cluster_inventory.txt and
+    cluster_hungry_tames.txt (and the same for any other report added with
+    cluster=True) covering all of them next to the maps.  Each map still
+    gets its own reports too.  With reports in options, only those are
+    written and merged.  report_plugins are loaded in every process; see
+    load_report_plugins.
+
+    processes is how many maps run at once (default: one per CPU, at most
+    one per map) and memory_limit_mb caps the memory each of those
+    processes allocates for a map (see MemoryWatchdog).  The
+    species table is loaded once here and handed to every map.  Each map is
+    parsed in a single process; options are the rest of main_conversion's
+    keyword arguments.
+
+    Returns the list of maps that failed.
+    """
+    start_time_seconds = round(time.time())
+    ark_binary_filenames = find_ark_files(path_or_pattern)
+    if not ark_binary_filenames:
+        print("No .ark files found in {}".format(path_or_pattern))
+        return []
+    processes = max(1, min(processes or os.cpu_count() or 1, len(ark_binary_filenames)))
+    options['workers'] = 1
+    options['compression'] = codec = choose_codec(options.get('compression', None))
+    values_by_bp = load_values_json()
+
+    print("Processing {} maps, {} at a time...".format(len(ark_binary_filenames), processes), flush=True)
+    failed = []
+    with ProcessPoolExecutor(max_workers=processes, initializer=limit_batch_process, initargs=(memory_limit_mb,)) as executor:
+        tasks = [executor.submit(run_batch_map, (ark_binary_filename, options, values_by_bp, report_plugins)) for ark_binary_filename in ark_binary_filenames]
+        for task in as_completed(tasks):
+            (ark_binary_filename, error, seconds) = task.result()
+            if error:
+                failed.append(ark_binary_filename)
+                print("    {} failed after {:.1f} minutes: {} (see {})".format(ark_binary_filename, seconds / 60.0, error,
+                      ark_binary_filename.replace(".ark", "_log.txt")), flush=True)
+            else:
+                print("    {} done in {:.1f} minutes".format(ark_binary_filename, seconds / 60.0), flush=True)
+
+    done = [ark_binary_filename for ark_binary_filename in ark_binary_filenames if ark_binary_filename not in failed]
+    if done:
+        cluster_directory = os.path.commonpath([os.path.dirname(os.path.abspath(ark_binary_filename)) for ark_binary_filename in done])
+        reports = options.get('reports', None) or report_names()
+        for plugin in [REPORTS[name] for name in reports if REPORTS[name].cluster]:
+            report = plugin.filename("cluster.ark", codec)
+            map_reports = [(os.path.basename(ark_binary_filename).replace(".ark", ""), plugin.filename(ark_binary_filename, codec))
+                           for ark_binary_filename in done]
+            print("Wrote {}".format(report_cluster(os.path.join(cluster_directory, report), map_reports)), flush=True)
+
+    minutes = (round(time.time()) - start_time_seconds)/60.0
+    print("Completed {} of {} maps in {} minutes.".format(len(done), len(ark_binary_filenames), minutes), flush=True)
+    return failed
+
+
+def text_matches(value, wanted):
+    """ Case-insensitive 'contains' for query filters; no filter matches everything. """
+    return not wanted or wanted.lower() in str(value or "").lower()
+
+
+def query_numbers(query, name, count):
+    """
+    Reads a parameter like near=x,y,radius as a list of count numbers, or
+    None if it isn't there.  inf and nan aren't numbers here; they'd have
+    no grid cell (see grid_cell).
+    """
+    text = query.get(name)
+    if text is None:
+        return None
+    try:
+        numbers = [float(value) for value in text.split(",")]
+    except ValueError:
+        numbers = []
+    if len(numbers) != count or not all(math.isfinite(number) for number in numbers):
+        raise ValueError("{} needs {} numbers separated by commas".format(name, count))
+    return numbers
+
+
+def describe_owner_row(owner):
+    return {
+        'ownerId': owner.id,
+        'ownerClass': simplifyName(owner.className),
+        'x': owner.x, 'y': owner.y, 'z': owner.z,
+        'ownerName': owner.ownerName,
+        'owningPlayerName': owner.owningPlayerName + owner.playerName,
+        'tameName': owner.tameName,
+        'tribeName': owner.tribeName,
+    }
+
+
+class QueryService:
+    """
+    Keeps one map's GameState in memory between saves for --watch, and
+    answers questions about it.  reload() swaps in a new state when the
+    save changes; every query works on whichever state was current when
+    it started, so a reload never shows up halfway through an answer.
+
+    Queries return plain dicts and lists (they go out as json); report()
+    writes one of the usual TSV reports from the state in memory.  Those
+    two and object() read MyMap.json through the object index, so they do
+    that inside reading_files(), and a reload only swaps the new json and
+    index in once none of them has the old ones open.
+    parser is the json parser backend for objects that changed; see
+    choose_parser.
+    """
+
+    def __init__(self, ark_binary_filename, multipliers=None, values_by_bp=None, parser='auto'):
+        self.ark_binary_filename = ark_binary_filename
+        self.multipliers = multipliers
+        self.values_by_bp = values_by_bp
+        self.parser = parser
+        self.state = None
+        self.tame_food = []
+        self.loaded_fingerprint = None
+        self.failed_fingerprint = None
+        self.loaded_at = None
+        self.reloads = 0
+        self.last_error = None
+        self.files_changed = threading.Condition()
+        self.readers = 0
+        self.swapping = False
+
+    @contextlib.contextmanager
+    def reading_files(self):
+        """ For the duration of the with block, MyMap.json and its index won't be swapped. """
+        with self.files_changed:
+            while self.swapping:
+                self.files_changed.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.files_changed:
+                self.readers -= 1
+                self.files_changed.notify_all()
+
+    @contextlib.contextmanager
+    def swapping_files(self):
+        """
+        Waits until nothing has MyMap.json or its index open (Windows can't
+        replace a file that's mapped), and keeps new readers out until the
+        with block is done, so nobody sees the new json with the old index.
+        """
+        with self.files_changed:
+            self.swapping = True
+            while self.readers:
+                self.files_changed.wait()
+        try:
+            yield
+        finally:
+            with self.files_changed:
+                self.swapping = False
+                self.files_changed.notify_all()
+
+    def reload(self):
+        """
+        Reads the save again and switches queries over to the result; see
+        read_save.  If that fails, queries keep getting answered from the
+        last good state.  A save that couldn't be read is remembered in
+        failed_fingerprint so --watch doesn't try it again every poll,
+        unless it was an OSError (the file was locked or being replaced),
+        which may well work next time.
+        """
+        fingerprint = save_fingerprint(self.ark_binary_filename, with_hash=False)
+        if self.values_by_bp is None:
+            self.values_by_bp = load_values_json()
+        try:
+            state = self.read_save()
+        except Exception as e:
+            self.last_error = "{}: {}".format(type(e).__name__, e)
+            print("Reloading {} failed: {}".format(self.ark_binary_filename, self.last_error), flush=True)
+            if not isinstance(e, OSError):
+                self.failed_fingerprint = fingerprint
+            return False
+        tame_food = list(iter_tame_food(state, self.values_by_bp, self.multipliers))
+        (self.state, self.tame_food) = (state, tame_food)
+        self.loaded_fingerprint = fingerprint
+        self.loaded_at = time.time()
+        self.reloads += 1
+        self.last_error = None
+        return True
+
+    def read_save(self):
+        """
+        Converts the save and reads it into a copy of the state in memory,
+        so only the game objects that changed since the last save get
+        parsed (see process_game_objects_incremental); the state queries
+        are using is left alone until it's done.  The first time, the
+        baseline is the cache an earlier run left, if any, and if that was
+        built from this very save there's nothing to convert at all.
+
+        Only MyMap.json and MyMap_objects.idx get written.  Both are
+        written next to the old ones first and then swapped in together
+        (see swapping_files), so queries still reading the old ones aren't
+        disturbed.  There are no report, cache or metrics files; report()
+        writes a report on request.
+        """
+        ark_binary_filename = self.ark_binary_filename
+        json_filename = ark_binary_filename.replace(".ark", ".json")
+        if self.state is not None:
+            state = self.state.copy()
+        else:
+            state = GameState()
+            cache_filename = ark_binary_filename.replace(".ark", "_cache.pickle")
+            if load_cached_state(state, cache_filename, ark_binary_filename) is not None and state.object_digests:
+                print("{} is unchanged; loaded its game objects from {}".format(ark_binary_filename, cache_filename), flush=True)
+                return state
+            if load_cached_state(state, cache_filename, ark_binary_filename, require_same_save=False) is None or not state.object_digests:
+                state.clear()  # no usable baseline, so everything counts as added
+
+        new_json_filename = json_filename + ".tmp"
+        print("Converting {} to json...".format(ark_binary_filename), flush=True)
+        totalObjectsCount = convert_binary_to_json(ark_binary_filename, new_json_filename)
+        offsets = ObjectOffsets()
+        (added, changed, removed) = process_game_objects_incremental(state, new_json_filename, totalObjectsCount, self.parser, offsets)
+        print("    {} added, {} changed, {} removed".format(added, changed, removed), flush=True)
+        index_filename = ark_binary_filename.replace(".ark", "_objects.idx")
+        new_index_filename = index_filename + ".tmp"
+        if write_object_index(offsets, new_index_filename, new_json_filename, json_filename) is None:
+            new_index_filename = None
+        with self.swapping_files():
+            remove_old_copies(json_filename, keep=json_filename)
+            os.replace(new_json_filename, json_filename)
+            if new_index_filename is not None:
+                os.replace(new_index_filename, index_filename)
+            elif os.path.exists(index_filename):
+                os.remove(index_filename)  # it would point into the old json
+        return state
+
+    def status(self, query):
+        state = self.state
+        return {
+            'map': self.ark_binary_filename,
+            'loaded': state is not None,
+            'loadedAt': self.loaded_at,
+            'reloads': self.reloads,
+            'lastError': self.last_error,
+            'objectTypes': dict(state.object_type_counts) if state else {},
+        }
+
+    def items(self, query):
+        """
+        Item stacks in inventories, as in the inventory report.  Filters:
+        name (item), owner (container class), tribe, player.
+        """
+        rows = []
+        for (owner, inventoryObject, stacks) in iter_inventory_contents(self.state):
+            if not text_matches(owner.tribeName, query.get('tribe')) or \
+               not text_matches(owner.owningPlayerName + owner.playerName, query.get('player')) or \
+               not text_matches(simplifyName(owner.className), query.get('owner')):
+                continue
+            for stack in stacks:
+                itemName = simplifyName(stack.className)
+                if text_matches(itemName, query.get('name')):
+                    row = describe_owner_row(owner)
+                    row.update({'inventoryId': inventoryObject.id, 'item': itemName,
+                                'quantity': stack.quantity, 'blueprint': bool(stack.blueprint)})
+                    rows.append(row)
+        return rows
+
+    def located(self, records, cells, query):
+        """
+        The records (owners or tames) within near=x,y,radius and inside
+        box=xmin,ymin,xmax,ymax, using the spatial index; all of them if
+        neither is given.
+        """
+        near = query_numbers(query, 'near', 3)
+        box = query_numbers(query, 'box', 4)
+        if near is None and box is None:
+            return list(records.values())
+        if near is None:
+            return records_in_box(records, cells, *box)
+        found = records_near(records, cells, *near)
+        if box is not None:
+            found = [record for record in found if box[0] <= record.x <= box[2] and box[1] <= record.y <= box[3]]
+        return found
+
+    def owners(self, query):
+        """
+        Things with an inventory.  Filters: name (class), tribe, player,
+        near=x,y,radius and box=xmin,ymin,xmax,ymax.
+        """
+        state = self.state
+        rows = []
+        for owner in self.located(state.owners, state.owner_cells, query):
+            if text_matches(simplifyName(owner.className), query.get('name')) and \
+               text_matches(owner.tribeName, query.get('tribe')) and \
+               text_matches(owner.owningPlayerName + owner.playerName, query.get('player')):
+                rows.append(describe_owner_row(owner))
+        return rows
+
+    def tames(self, query):
+        """
+        Tames with their food, as in the hungry tames report.  Filters:
+        name (species), tribe, player, near=x,y,radius,
+        box=xmin,ymin,xmax,ymax, hungry=1 for only the hungry ones and
+        outside_troughs=1 for only those out of reach of a feeding trough
+        (radius= to change how far a trough reaches).
+        """
+        (state, tame_food) = (self.state, self.tame_food)
+        hungry_only = query.get('hungry') in ('1', 'true', 'yes')
+        wanted = None
+        if 'near' in query or 'box' in query:
+            wanted = set(dino.id for dino in self.located(state.tame_dinos, state.tame_cells, query))
+        if query.get('outside_troughs') in ('1', 'true', 'yes'):
+            radius = query_numbers(query, 'radius', 1)
+            outside = set(dino.id for dino in tames_outside_troughs(state, radius[0] if radius else FEEDING_TROUGH_RADIUS))
+            wanted = outside if wanted is None else wanted & outside
+        rows = []
+        for (dino, food) in tame_food:
+            if hungry_only and food['percent'] >= HUNGRY_FOOD_PERCENT:
+                continue
+            if wanted is not None and dino.id not in wanted:
+                continue
+            if text_matches(simplifyName(dino.className), query.get('name')) and \
+               text_matches(dino.tribeName, query.get('tribe')) and \
+               text_matches(dino.owningPlayerName, query.get('player')):
+                rows.append({
+                    'id': dino.id, 'dino': simplifyName(dino.className), 'name': dino.tamedName,
+                    'x': dino.x, 'y': dino.y, 'z': dino.z,
+                    'level': food['level'], 'foodCurrent': food['current'], 'foodTotal': food['total'],
+                    'foodPercent': food['percent'], 'tamerString': dino.tamerString,
+                    'playerName': dino.owningPlayerName, 'tribeName': dino.tribeName,
+                })
+        return rows
+
+    @staticmethod
+    def reports():
+        """ The TSV reports there are, by the name in their filename (inventory, hungry_tames, low_fuel...). """
+        return dict((plugin.stage, plugin) for plugin in REPORTS.values() if plugin.suffix.endswith(".txt"))
+
+    def report(self, name):
+        """
+        Writes the named TSV report from the state in memory and returns it
+        as bytes.  It's written to a file of its own in a temporary
+        directory, so requests at the same time (and the MyMap_*.txt a run
+        leaves) never share a file.
+        """
+        plugin = self.reports()[name]
+        state = self.state
+        with self.reading_files():
+            try:
+                objects = open_object_index(self.ark_binary_filename)
+            except (OSError, ValueError):
+                objects = None
+            try:
+                with tempfile.TemporaryDirectory() as directory:
+                    filename = plugin.filename(os.path.join(directory, os.path.basename(self.ark_binary_filename)))
+                    plugin.write(state, filename, {'multipliers': self.multipliers, 'values_by_bp': self.values_by_bp, 'objects': objects})
+                    with open(filename, 'rb') as infile:
+                        return infile.read()
+            finally:
+                if objects is not None:
+                    objects.close()
+
+    def object(self, query):
+        """
+        The game object with id=, whole, as the json has it (see
+        ObjectIndex); for following up on a row of any of the other
+        answers or reports.
+        """
+        try:
+            objectId = int(query.get('id', ''))
+        except ValueError:
+            raise ValueError("id must be a game object id")
+        with self.reading_files():
+            with open_object_index(self.ark_binary_filename) as index:
+                return index.get(objectId)
+
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    """
+    The HTTP side of --watch.  GET only:
+
+        /status
+        /items?name=Tek&tribe=...&player=...&owner=...
+        /owners?name=StorageBox&tribe=...&player=...&near=x,y,radius&box=xmin,ymin,xmax,ymax
+        /tames?hungry=1&outside_troughs=1&tribe=...&player=...&name=Rex&near=...&box=...
+        /object?id=1234
+        /reports/inventory, /reports/hungry_tames, /reports/low_fuel
+
+    Lists come back as json, at most limit= rows (default QUERY_ROW_LIMIT);
+    /object is the game object's json, and reports come back as the TSV text.
+    """
+    service = None  # set by watch_save on a subclass
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        query = {key: values[-1] for (key, values) in urllib.parse.parse_qs(url.query).items()}
+        path = url.path.rstrip("/")
+        if path == "/status":
+            return self.send_json(self.service.status(query))
+        if self.service.state is None:
+            return self.send_json({'error': "still reading the save; try again shortly"}, 503)
+        if path in ("/items", "/owners", "/tames"):
+            try:
+                limit = int(query.get('limit', QUERY_ROW_LIMIT))
+            except ValueError:
+                return self.send_json({'error': "limit must be a number"}, 400)
+            started = time.perf_counter()
+            try:
+                rows = getattr(self.service, path[1:])(query)
+            except ValueError as e:
+                return self.send_json({'error': str(e)}, 400)
+            return self.send_json({'count': len(rows), 'results': rows[:limit],
+                                   'milliseconds': round(1000 * (time.perf_counter() - started), 1)})
+        if path == "/object":
+            try:
+                gameobject = self.service.object(query)
+            except ValueError as e:
+                return self.send_json({'error': str(e)}, 400)
+            except OSError as e:
+                return self.send_json({'error': str(e)}, 404)
+            if gameobject is None:
+                return self.send_json({'error': "no game object {}".format(query['id'])}, 404)
+            return self.send_json(gameobject)
+        if path.startswith("/reports/") and path[len("/reports/"):] in QueryService.reports():
+            return self.send_body(self.service.report(path[len("/reports/"):]), "text/tab-separated-values; charset=utf-8")
+        return self.send_json({'error': "unknown path " + url.path}, 404)
+
+    def send_json(self, value, code=200):
+        self.send_body(json.dumps(value).encode("utf-8"), "application/json", code)
+
+    def send_body(self, body, content_type, code=200):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # one line per query would bury the reload messages
+
+
+def watch_save(ark_binary_filename, host="127.0.0.1", port=WATCH_PORT, poll_seconds=WATCH_POLL_SECONDS, **options):
+    """
+    Runs until interrupted: reads the save, serves queries about it over
+    HTTP (see QueryRequestHandler), and reads it again each time the game
+    writes a new one.  A save counts as written once its size and mtime
+    stop changing for one poll, so a half-written save isn't picked up.
+    options go to QueryService; reloads are incremental, so only the
+    game objects that changed get parsed again.
+    """
+    service = QueryService(ark_binary_filename, **options)
+    handler = type('BoundQueryRequestHandler', (QueryRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print("Answering queries on http://{}:{}/ (try /status); Ctrl-C to stop.".format(host, server.server_address[1]), flush=True)
+
+    try:
+        service.reload()
+        previous = None
+        while True:
+            time.sleep(poll_seconds)
+            try:
+                current = save_fingerprint(ark_binary_filename, with_hash=False)
+            except OSError:
+                continue  # the game replaces the file when it saves
+            if current not in (service.loaded_fingerprint, service.failed_fingerprint) and current == previous:
+                print("{} changed; reading it again.".format(ark_binary_filename), flush=True)
+                service.reload()
+            previous = current
+    except KeyboardInterrupt:
+        print("Stopping.", flush=True)
+    finally:
+        server.shutdown()
+        server.server_close()
 
 
 def main(argv):
-    if not len(argv) == 2:
+    if len(argv) < 2:
         print("Missing input file command line argument.  Please provide a path to your input file.")
         print("Usage:\t    python ConvertAndAnalyzeArkSave.py path/to/TheIsland.ark")
         exit(1)
-    ark_binary_filename = argv[1] # 0 is the script name
-    main_conversion(ark_binary_filename)
+    parser = argparse.ArgumentParser(prog="ConvertAndAnalyzeArkSave.py",
+        description="Converts an Ark save to json and reports on inventories, hungry tames and low-fuel generators.")
+    parser.add_argument("ark_binary_filename", metavar="path/to/TheIsland.ark", nargs='?')
+    parser.add_argument("--workers", type=int, default=1,
+        help="number of processes used to parse game objects (default 1)")
+    parser.add_argument("--write-game-objects", action="store_true",
+        help="also write the simplified MyMap_game_objects.json")
+    parser.add_argument("--no-cache", action="store_true",
+        help="ignore MyMap_cache.pickle and convert the save again")
+    parser.add_argument("--incremental", action="store_true",
+        help="only process game objects that changed since the previous save, and write MyMap_delta.txt")
+    parser.add_argument("--pipeline", action="store_true",
+        help="process game objects while the converter is still writing the json")
+    parser.add_argument("--server-multipliers", metavar="IdM=0.5,TaM=0.14",
+        help="the server's stat multipliers IwM, TmM, IdM, TaM, IBM if they aren't all 1.0")
+    parser.add_argument("--batch", metavar="DIR_OR_GLOB",
+        help="process every .ark in a directory (or matching a glob like 'saves/*.ark') and merge their reports")
+    parser.add_argument("--processes", type=int,
+        help="with --batch, how many maps to process at once (default: one per CPU)")
+    parser.add_argument("--memory-limit-mb", type=int,
+        help="with --batch, the most memory each map's process may allocate (Linux only)")
+    parser.add_argument("--watch", action="store_true",
+        help="keep running, read the save again whenever it changes, and answer queries over HTTP")
+    parser.add_argument("--host", default="127.0.0.1",
+        help="with --watch, the address to answer queries on (default 127.0.0.1, this machine only)")
+    parser.add_argument("--port", type=int, default=WATCH_PORT,
+        help="with --watch, the port to answer queries on (default {})".format(WATCH_PORT))
+    parser.add_argument("--low-memory", action="store_true",
+        help="keep owners, inventories and item stacks on disk instead of in memory, for saves too big for RAM")
+    parser.add_argument("--memory-ceiling-mb", type=int, default=LOW_MEMORY_CEILING_MB,
+        help="with --low-memory, roughly how much memory those may take (default {})".format(LOW_MEMORY_CEILING_MB))
+    parser.add_argument("--parser", choices=["auto"] + list(PARSER_BACKENDS), default="auto",
+        help="how to parse the json (default auto: the fastest that works); all of them give the same result")
+    parser.add_argument("--find-item", metavar="NAME",
+        help="look NAME up in MyMap_items.sqlite from an earlier run (without reading the save) and print who holds it")
+    parser.add_argument("--object", type=int, nargs='+', metavar="ID",
+        help="print the game objects with these ids from MyMap.json, using MyMap_objects.idx from an earlier run")
+    parser.add_argument("--by", choices=["tribe", "player"],
+        help="with --find-item, print totals per tribe or per player instead of every stack")
+    parser.add_argument("--reports", metavar="inventory,items,hungry,fuel",
+        help="only write these reports (default all); game objects none of them need are skipped while reading")
+    parser.add_argument("--compress", choices=["none"] + list(COMPRESSION_EXTENSIONS), default="none",
+        help="compress the reports and intermediate json with gzip or zstd (zstd needs the zstandard package)")
+    parser.add_argument("--delete-intermediates", action="store_true",
+        help="delete the converter's json (and MyMap_game_objects.json) once the game objects have been read")
+    parser.add_argument("--report-plugin", action="append", metavar="FILE_OR_MODULE",
+        help="load more reports from a python file or module that registers them with add_report; can be repeated")
+    args = parser.parse_args(argv[1:]) # 0 is the script name
+    if (args.ark_binary_filename is None) == (args.batch is None):
+        parser.error("give either one save file or --batch, not both")
+    if args.find_item and args.batch:
+        parser.error("--find-item looks in one save's MyMap_items.sqlite; give the save, not --batch")
+    if args.object and args.batch:
+        parser.error("--object looks in one save's MyMap_objects.idx; give the save, not --batch")
+    if args.find_item:
+        try:
+            print_item_lookup(args.ark_binary_filename, args.find_item, args.by)
+        except (OSError, ValueError) as e:
+            print(e)
+            exit(1)
+        return
+    if args.object:
+        try:
+            print_object_lookup(args.ark_binary_filename, args.object)
+        except (OSError, ValueError) as e:
+            print(e)
+            exit(1)
+        return
+    if args.watch and args.batch:
+        parser.error("--watch follows one save; it can't be combined with --batch")
+    if args.watch and args.reports:
+        parser.error("--watch answers every kind of query, so it always reads everything; leave out --reports")
+    if args.watch and (args.workers > 1 or args.pipeline or args.write_game_objects or args.compress != "none" or args.delete_intermediates):
+        parser.error("--watch reads each save incrementally and keeps MyMap.json to look objects up in; "
+                     "--workers, --pipeline, --write-game-objects, --compress and --delete-intermediates don't apply")
+    try:
+        load_report_plugins(args.report_plugin)
+    except Exception as e:  # whatever the plugin's own code raised
+        parser.error("couldn't load report plugin: {}: {}".format(type(e).__name__, e))
+    try:
+        multipliers = parse_server_multipliers(args.server_multipliers)
+        reports = parse_report_names(args.reports)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.batch:
+        failed = main_batch(args.batch, processes=args.processes, memory_limit_mb=args.memory_limit_mb, report_plugins=args.report_plugin,
+                            write_game_objects=args.write_game_objects, use_cache=not args.no_cache,
+                            incremental=args.incremental, pipeline=args.pipeline, multipliers=multipliers,
+                            low_memory=args.low_memory, memory_ceiling_mb=args.memory_ceiling_mb, parser=args.parser,
+                            reports=reports, compression=args.compress, delete_intermediates=args.delete_intermediates)
+        exit(1 if failed else 0)
+    if args.watch:
+        watch_save(args.ark_binary_filename, host=args.host, port=args.port, multipliers=multipliers, parser=args.parser)
+        return
+    main_conversion(args.ark_binary_filename, write_game_objects=args.write_game_objects,
+                    workers=max(1, args.workers), use_cache=not args.no_cache, incremental=args.incremental,
+                    pipeline=args.pipeline, multipliers=multipliers, low_memory=args.low_memory,
+                    memory_ceiling_mb=args.memory_ceiling_mb, parser=args.parser, reports=reports,
+                    compression=args.compress, delete_intermediates=args.delete_intermediates)
 
 
 # Actual entry point if run as a script; does not trigger automatically if imported as a library.
@@ -0,0 +1,287 @@
+import os
+import sys
+import json
+import random
+import argparse
+
+"""
+Makes up a save in the same json format ArkBinaryToJsonConvertor.exe
+writes, plus a values.json to go with it, so the analyzer can be run and
+timed on any machine without a real .ark or the Windows-only converter.
+
+The mix is loosely modelled on a busy PvE server: lots of structures and
+wild dinos, storage boxes, fridges full of cryopods, generators holding
+gasoline, players with engrams and hidden default items, and tames with
+their status components.  Objects are written one at a time, so millions
+of them don't need millions of dicts in memory.
+
+Usage:   python GenerateSyntheticArkSave.py --objects 1000000 --out bench/TheIsland.json
+         (also writes bench/values.json unless --values says otherwise)
+"""
+
+SPECIES = ["Raptor", "Ptero", "Rex", "Stego", "Trike", "Argent", "Ankylo", "Doed",
+           "Para", "Bronto", "Spino", "Quetz", "Carno", "Allo", "Theri", "Mammoth",
+           "Sabertooth", "Direwolf", "Beaver", "Dodo"]
+MOD_SPECIES = ["Crab", "Rockwell", "SpiderL"]
+NOT_REALLY_DINOS = ["Raft_BP_C", "MotorRaft_BP_C", "TekHoverSkiff_Character_BP_C"]
+STRUCTURES = ["Wall_Wood_C", "Wall_Stone_C", "Foundation_Stone_C", "Ceiling_Metal_C",
+              "Door_Metal_C", "Ramp_Wood_C", "Pillar_Stone_C", "Window_Metal_C", "Fence_Foundation_Stone_C"]
+STORAGE = ["StorageBox_Small_C", "StorageBox_Large_C", "StorageBox_Huge_C", "Forge_C", "Smithy_C", "Fabricator_C"]
+RESOURCES = ["PrimalItemResource_Stone_C", "PrimalItemResource_Wood_C", "PrimalItemResource_Metal_C",
+             "PrimalItemResource_Thatch_C", "PrimalItemResource_Fiber_C", "PrimalItemResource_Element_C",
+             "PrimalItemResource_Crystal_C", "PrimalItemResource_Polymer_C", "PrimalItemConsumable_Berry_Mejoberry_C",
+             "PrimalItemConsumable_CookedMeat_C", "PrimalItemArmor_TekHelmet_C", "PrimalItem_WeaponMetalPick_C",
+             "PrimalItem_WeaponRifle_C", "PrimalItemAmmo_AdvancedRifleBullet_C", "PrimalItemArmor_RexSaddle_C"]
+TRIBES = ["Tribe of Ark", "The Dodo Lovers", "Meat Run", "Tek Heads", ""]
+PLAYERS = ["Alice", "Bob Smith", "Carol", "Dave", "Erin", "Frank", "Grace", ""]
+
+MIX = [
+    # (what, weight) -- one pick can write several objects
+    ("structure", 40),
+    ("wild_dino", 16),
+    ("foliage", 12),
+    ("storage", 6),
+    ("fridge", 1),
+    ("generator", 1),
+    ("tame", 4),
+    ("raft", 0.2),
+    ("player", 0.3),
+    ("tribute", 1),
+    ("player_status", 0.3),
+    ("loose_item", 3),
+]
+
+
+class SaveWriter:
+    """
+    Writes game objects into the converter's layout one at a time and hands
+    out the ids, which are just positions in the objects array.
+    """
+    def __init__(self, outfile):
+        self.outfile = outfile
+        self.next_id = 0
+        self.outfile.write('{\n  "saveVersion": 9,\n  "gameTime": 74892.3,\n  "saveCount": 1234,\n')
+        self.outfile.write('  "dataFiles": [\n    "TheIsland"\n  ],\n  "embeddedData": [],\n  "dataFilesObjectMap": {},\n')
+        self.outfile.write('  "objects": [')
+
+    def reserve(self, count=1):
+        first = self.next_id
+        self.next_id = self.next_id + count
+        return first
+
+    def write(self, gameobject):
+        if gameobject['id'] > 0:
+            self.outfile.write(',')
+        text = json.dumps(gameobject, indent=2)
+        self.outfile.write('\n    ' + text.replace('\n', '\n    '))
+
+    def close(self):
+        self.outfile.write('\n  ],\n  "hibernation": {\n    "classes": [],\n    "indices": [],\n    "objects": []\n  }\n}\n')
+
+
+def prop(name, value, proptype="StrProperty", index=None):
+    entry = {"name": name, "type": proptype, "value": value}
+    if index:
+        entry["index"] = index
+    return entry
+
+def location(rng):
+    return {"x": round(rng.uniform(-340000, 340000), 3), "y": round(rng.uniform(-340000, 340000), 3),
+            "z": round(rng.uniform(-15000, 15000), 3), "pitch": 0.0, "yaw": round(rng.uniform(-180, 180), 3), "roll": 0.0}
+
+def game_object(objectId, className, properties, rng=None, names=None):
+    gameobject = {"id": objectId, "class": className, "names": names or [className + "_" + str(objectId)]}
+    if rng is not None:
+        gameobject["location"] = location(rng)
+    gameobject["properties"] = properties
+    return gameobject
+
+def ownership(rng):
+    properties = []
+    tribe = rng.choice(TRIBES)
+    if tribe:
+        properties.append(prop("TribeName", tribe))
+    player = rng.choice(PLAYERS)
+    if player:
+        properties.append(prop("OwningPlayerName", player))
+    properties.append(prop("TargetingTeam", rng.randint(50000000, 59999999), "IntProperty"))
+    return properties
+
+def item_stack(objectId, inventoryId, className, rng, quantity=None):
+    properties = [prop("OwnerInventory", inventoryId, "ObjectProperty"),
+                  prop("ItemId", {"ItemID1": rng.randint(0, 2**31), "ItemID2": rng.randint(0, 2**31)}, "StructProperty")]
+    roll = rng.random()
+    if quantity is None and roll < 0.75:
+        quantity = rng.randint(2, 100)
+    if quantity is not None:
+        properties.append(prop("ItemQuantity", quantity, "IntProperty"))
+    if roll > 0.92:
+        properties.append(prop("bIsBlueprint", True, "BoolProperty"))
+    elif roll > 0.88:
+        properties.append(prop("bIsBlueprint", False, "BoolProperty"))
+    properties.append(prop("SavedDurability", round(rng.random(), 4), "FloatProperty"))
+    return game_object(objectId, className, properties)
+
+def inventory(writer, ownerId, className, rng, stack_classes, extra=None):
+    """ Writes an inventory component followed by its item stacks. """
+    inventoryId = writer.reserve()
+    stackIds = list(range(writer.next_id, writer.next_id + len(stack_classes) + len(extra or [])))
+    writer.reserve(len(stackIds))
+    writer.write(game_object(inventoryId, className, [
+        prop("InventoryItems", stackIds, "ArrayProperty"),
+        prop("bInitializedMe", True, "BoolProperty"),
+        prop("MaxInventoryItems", 300, "IntProperty"),
+    ]))
+    for (stackId, stackClass) in zip(stackIds, stack_classes):
+        writer.write(item_stack(stackId, inventoryId, stackClass, rng))
+    for (stackId, gameobject) in zip(stackIds[len(stack_classes):], extra or []):
+        gameobject['id'] = stackId
+        gameobject['properties'].insert(0, prop("OwnerInventory", inventoryId, "ObjectProperty"))
+        writer.write(gameobject)
+    return inventoryId
+
+def status_component(objectId, className, rng, tamed):
+    properties = []
+    for stat in range(12):
+        if stat in (6, 10, 11) or rng.random() < 0.2:
+            continue
+        properties.append(prop("CurrentStatusValues", round(rng.uniform(5, 5000), 3), "FloatProperty", stat))
+    for stat in range(12):
+        if rng.random() < 0.5:
+            properties.append(prop("NumberOfLevelUpPointsApplied", rng.randint(1, 40), "ByteProperty", stat))
+        if tamed and rng.random() < 0.4:
+            properties.append(prop("NumberOfLevelUpPointsAppliedTamed", rng.randint(1, 25), "ByteProperty", stat))
+    properties.append(prop("BaseCharacterLevel", rng.randint(1, 150), "IntProperty"))
+    if tamed:
+        if rng.random() < 0.7:
+            properties.append(prop("ExtraCharacterLevel", rng.randint(1, 73), "UInt16Property"))
+        if rng.random() < 0.8:
+            properties.append(prop("TamedIneffectivenessModifier", round(rng.random() * 0.5, 4), "FloatProperty"))
+        if rng.random() < 0.3:
+            properties.append(prop("DinoImprintingQuality", round(rng.random(), 4), "FloatProperty"))
+    return game_object(objectId, className, properties)
+
+def dino_class(rng):
+    if rng.random() < 0.1:
+        return rng.choice(MOD_SPECIES) + "_Character_BP_C"
+    return rng.choice(SPECIES) + "_Character_BP_C"
+
+def write_dino(writer, rng, tamed, className=None, in_cryopod=False):
+    className = className or dino_class(rng)
+    dinoId = writer.reserve()
+    statusId = writer.reserve()
+    properties = [prop("MyCharacterStatusComponent", statusId, "ObjectProperty"),
+                  prop("RandomMutationRolls", rng.randint(0, 10), "IntProperty")]
+    names = [className + "_" + str(dinoId)]
+    if tamed:
+        properties = ownership(rng) + [prop("TamerString", rng.choice(TRIBES) or "Alice"),
+                                       prop("TamedName", rng.choice(["Fluffy", "Chomper", "", "Sir Dodo"]) + str(dinoId))] + properties
+        if in_cryopod:
+            names.append("PrimalItem_WeaponEmptyCryopod_C_" + str(rng.randint(1, 99999)))
+    saddled = tamed and rng.random() < 0.5
+    if saddled:
+        properties.insert(rng.randint(0, len(properties)), prop("MyInventoryComponent", statusId + 1, "ObjectProperty"))
+    writer.write(game_object(dinoId, className, properties, rng, names))
+    writer.write(status_component(statusId, "DinoCharacterStatusComponent_BP_" + className.replace("_Character_BP_C", "_C"), rng, tamed))
+    if saddled:
+        inventory(writer, dinoId, "PrimalInventoryComponent_Dino_C",
+                  rng, [rng.choice(RESOURCES) for i in range(rng.randint(0, 6))])
+
+def write_owner(writer, rng, className, stack_classes, extra=None, owner_properties=None):
+    ownerId = writer.reserve()
+    properties = ownership(rng) + (owner_properties or []) + [prop("MyInventoryComponent", ownerId + 1, "ObjectProperty")]
+    if rng.random() < 0.5:
+        properties.append(prop("OwnerName", rng.choice(PLAYERS) or "Nobody"))
+    rng.shuffle(properties)
+    writer.write(game_object(ownerId, className, properties, rng))
+    inventory(writer, ownerId, "PrimalInventoryBP_" + className, rng, stack_classes, extra)
+
+def write_pick(writer, rng, what):
+    if what == "structure":
+        objectId = writer.reserve()
+        writer.write(game_object(objectId, rng.choice(STRUCTURES), ownership(rng) + [prop("Health", 10000.0, "FloatProperty")], rng))
+    elif what == "foliage":
+        objectId = writer.reserve()
+        writer.write(game_object(objectId, rng.choice(["Tree_Redwood_C", "Rock_Big_C", "Bush_C"]), [prop("bHarvested", True, "BoolProperty")], rng))
+    elif what == "wild_dino":
+        write_dino(writer, rng, tamed=False)
+    elif what == "tame":
+        write_dino(writer, rng, tamed=True)
+    elif what == "raft":
+        write_dino(writer, rng, tamed=True, className=rng.choice(NOT_REALLY_DINOS))
+    elif what == "storage":
+        write_owner(writer, rng, rng.choice(STORAGE), [rng.choice(RESOURCES) for i in range(rng.randint(0, 30))])
+    elif what == "generator":
+        write_owner(writer, rng, "ElectricGenerator_C", ["PrimalItemResource_Gasoline_C"] * rng.randint(0, 6))
+    elif what == "fridge":
+        pods = rng.randint(1, 8)
+        write_owner(writer, rng, "CryoFridge_C", ["PrimalItem_WeaponEmptyCryopod_C"] * pods)
+        # the dinos inside are still in the save, marked by their names
+        for i in range(pods):
+            write_dino(writer, rng, tamed=True, in_cryopod=True)
+    elif what == "player":
+        engrams = [game_object(0, "PrimalItem_Engram" + rng.choice(SPECIES) + "Saddle_C",
+                               [prop("bIsEngram", True, "BoolProperty")]) for i in range(rng.randint(20, 120))]
+        hidden = [game_object(0, "PrimalItem_WeaponMap_C", [prop("bAllowRemovalFromInventory", False, "BoolProperty")])]
+        player = rng.choice(PLAYERS) or "Ghost"
+        write_owner(writer, rng, "PlayerPawnTest_Male_C", [rng.choice(RESOURCES) for i in range(rng.randint(0, 20))],
+                    hidden + engrams, [prop("PlayerName", player)])
+    elif what == "tribute":
+        objectId = writer.reserve()
+        writer.write(game_object(objectId, "TributeInventory_C", [prop("UploadedItems", [], "ArrayProperty")]))
+    elif what == "player_status":
+        objectId = writer.reserve()
+        writer.write(status_component(objectId, "PlayerCharacterStatusComponent_BP_C", rng, tamed=False))
+    elif what == "loose_item":
+        objectId = writer.reserve()
+        writer.write(item_stack(objectId, -1, rng.choice(RESOURCES), rng))
+
+def generate_save(json_filename, objects, seed=1):
+    """
+    Writes at least objects game objects (the last pick can run a few over)
+    to json_filename.  Returns how many were written.
+    """
+    rng = random.Random(seed)
+    picks = [what for (what, weight) in MIX]
+    weights = [weight for (what, weight) in MIX]
+    with open(json_filename, "w") as outfile:
+        writer = SaveWriter(outfile)
+        while writer.next_id < objects:
+            write_pick(writer, rng, rng.choices(picks, weights)[0])
+        writer.close()
+    return writer.next_id
+
+def generate_values(values_filename, seed=1):
+    """ A values.json in the ArkSmartBreeding layout covering the species above. """
+    rng = random.Random(seed)
+    species = []
+    for (name, path) in [(name, "/Game/PrimalEarth/Dinos/") for name in SPECIES] + \
+                        [(name, "/Game/Mods/SomeMod/Dinos/") for name in MOD_SPECIES]:
+        blueprint = name + "_Character_BP"
+        fullStatsRaw = []
+        for stat in range(12):
+            if stat in (6, 10, 11):
+                fullStatsRaw.append(None)
+            else:
+                fullStatsRaw.append([round(rng.uniform(50, 4000), 1), round(rng.uniform(0.05, 0.2), 3),
+                                     round(rng.uniform(0.01, 0.17), 3), round(rng.uniform(0, 0.5), 2), round(rng.uniform(0, 0.45), 2)])
+        species.append({"name": name, "blueprintPath": path + name + "/" + blueprint + "." + blueprint,
+                        "fullStatsRaw": fullStatsRaw, "TamedBaseHealthMultiplier": round(rng.uniform(0.8, 1.0), 3)})
+    with open(values_filename, "w") as outfile:
+        json.dump({"version": "1.0", "format": "1.13", "species": species}, outfile, indent=1)
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Writes a made-up converter-format save for benchmarking.")
+    parser.add_argument('--objects', type=int, default=100000, help="how many game objects, e.g. 100000, 1000000, 5000000")
+    parser.add_argument('--out', default="TheIsland.json", help="json file to write")
+    parser.add_argument('--values', default=None, help="values.json to write (default: next to --out)")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv[1:])
+
+    written = generate_save(args.out, args.objects, args.seed)
+    values_filename = args.values or os.path.join(os.path.dirname(args.out), "values.json")
+    generate_values(values_filename, args.seed)
+    print("Wrote {} game objects to {} and species values to {}".format(written, args.out, values_filename))
+
+if __name__ == '__main__':
+    main(sys.argv)